@@ -1,48 +1,85 @@
 from abc import ABC, abstractmethod
+import asyncio
+import inspect
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import redis
 import pandas as pd
-import pickle
 from functools import wraps
-from typing import Callable, Any, Optional
-from loguru import logger
+from typing import Awaitable, Callable, Any, Iterable, List, Optional, TypeVar
+from data_hooks.memory_cache import MemoryCache, shared_cache
+from data_hooks.serializers import ArrowSerializer, Serializer
+from db.pools import close_asyncpg_pools, get_redis_pool
+from utils.bar_days import settled_before
+
+T = TypeVar("T")
 
 
 class Datahook(ABC):
-    def __init__(self):
-        self.redis = redis.Redis(host="localhost", port=6379, db=0)
+    # Hooks can point this at their own MemoryCache to get a separate budget
+    memory_cache: Optional[MemoryCache] = None
+
+    def __init__(self, serializer: Optional[Serializer] = None):
+        # Clients are cheap wrappers around the process-wide connection pool
+        self.redis = redis.Redis(
+            connection_pool=get_redis_pool(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                db=int(os.getenv("REDIS_DB", 0)),
+            )
+        )
+        self.serializer = serializer or ArrowSerializer()
+        self.cache_token = uuid.uuid4().hex
+
+    def get_memory_cache(self) -> MemoryCache:
+        return self.memory_cache or shared_cache
 
     @staticmethod
-    def cache_df(ttl: int = 3600):
-        """Decorator for caching DataFrame results in Redis."""
+    def cache_memory(
+        ttl: Optional[float] = None, live_ttl: float = 60, per_instance: bool = False
+    ):
+        """
+        Decorator for caching results in the in-process memory cache.
+
+        Keys are built from the bound arguments, never from ``self``, so cached
+        values do not keep hook instances alive. Calls whose ``end_date`` is
+        None or reaches days that may still be filling in (BARS_SETTLE_DAYS)
+        expire after ``live_ttl``, others after ``ttl`` (None keeps them until
+        evicted). ``cache=False`` bypasses the cache.
+
+        Args:
+            ttl (float, None): Seconds to keep results for closed ranges.
+            live_ttl (float): Seconds to keep results for ranges touching now.
+            per_instance (bool): Scope entries to the instance, for methods
+                that depend on instance state.
+        """
 
         def decorator(func: Callable) -> Callable:
+            signature = inspect.signature(func)
+
             @wraps(func)
             def wrapper(instance: "Datahook", *args, **kwargs):
-                if not kwargs.get("cache", False):
+                bound = signature.bind(instance, *args, **kwargs)
+                bound.apply_defaults()
+                arguments = dict(list(bound.arguments.items())[1:])
+                if arguments.get("cache") is False:
                     return func(instance, *args, **kwargs)
 
-                cache_key = (
-                    f"{instance.__class__.__name__}:{func.__name__}:{str(kwargs)}"
+                owner = (
+                    instance.cache_token
+                    if per_instance
+                    else instance.__class__.__name__
                 )
-
-                try:
-                    cached_data = instance.redis.get(cache_key)
-                    if cached_data:
-                        logger.info(f"Cache hit for {cache_key}")
-                        return pickle.loads(cached_data)  # type: ignore
-
-                    result = func(instance, *args, **kwargs)
-                    if not isinstance(result, pd.DataFrame):
-                        logger.warning(f"Result is not a DataFrame, skipping cache")
-                        return result
-
-                    instance.redis.setex(cache_key, ttl, pickle.dumps(result))
-                    logger.info(f"Cached DataFrame for {cache_key}")
-
+                key = (owner, func.__name__, repr(sorted(arguments.items())))
+                memory = instance.get_memory_cache()
+                result = memory.get(key)
+                if result is not None:
                     return result
-                except redis.RedisError as e:
-                    logger.warning(f"Redis error: {e}. Returning uncached data.")
-                    return func(instance, *args, **kwargs)
+
+                result = func(instance, *args, **kwargs)
+                memory.set(key, result, ttl=live_ttl if _is_live(arguments) else ttl)
+                return result
 
             return wrapper
 
@@ -57,3 +94,54 @@ class Datahook(ABC):
     def get_raw_data(self, **kwargs) -> pd.DataFrame:
         """Get raw data."""
         pass
+
+    async def get_data_async(self, **kwargs) -> pd.DataFrame:
+        """Get processed data without blocking the event loop."""
+        return await asyncio.to_thread(self.get_data, **kwargs)
+
+    async def get_raw_data_async(self, **kwargs) -> pd.DataFrame:
+        """Get raw data without blocking the event loop."""
+        return await asyncio.to_thread(self.get_raw_data, **kwargs)
+
+
+async def gather_bounded(aws: Iterable[Awaitable[T]], limit: int = 8) -> List[T]:
+    """Await everything concurrently with at most ``limit`` in flight, in order."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return list(await asyncio.gather(*(bounded(aw) for aw in aws)))
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code, notebooks included.
+
+    A fresh event loop is used, in a helper thread when one is already running
+    (Jupyter), and the asyncpg pools it opened are closed before returning.
+    """
+
+    async def run() -> T:
+        try:
+            return await coro
+        finally:
+            await close_asyncpg_pools()
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run())
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, run()).result()
+
+
+def _is_live(arguments: dict) -> bool:
+    """Whether a call's requested range is open-ended or reaches unsettled days."""
+    if "end_date" not in arguments:
+        return False
+    end_date = arguments["end_date"]
+    if end_date is None:
+        return True
+    return pd.Timestamp(end_date) >= settled_before()
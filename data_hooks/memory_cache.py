@@ -0,0 +1,92 @@
+from collections import OrderedDict
+import os
+import sys
+import threading
+import time
+from typing import Any, Hashable, Optional, Tuple
+import pandas as pd
+
+
+def object_size(obj: Any) -> int:
+    """Approximate in-memory size in bytes, exact for pandas objects."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, (tuple, list)):
+        return sys.getsizeof(obj) + sum(object_size(item) for item in obj)
+    return sys.getsizeof(obj)
+
+
+class MemoryCache:
+    """
+    Thread-safe in-process LRU cache bounded by bytes instead of entry count.
+
+    Entries carry their own expiry so results covering ranges that touch "now"
+    can live shorter than immutable historical ones.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024**2):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store a value, returns False if it alone exceeds the byte budget."""
+        size = object_size(value)
+        if size > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + ttl if ttl is not None else float("inf")
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Process-wide cache shared by every data hook unless a hook sets its own
+shared_cache = MemoryCache(int(os.getenv("DATAHOOK_MEMORY_CACHE_BYTES", 512 * 1024**2)))
@@ -0,0 +1,82 @@
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import redis
+from data_hooks.serializers import Serializer
+from utils.bar_days import day_intervals, split_by_day
+
+
+class SegmentCache:
+    """
+    Redis cache of a time series split into fixed, day-sized segments.
+
+    Each segment is stored under its own key, so any requested range can be
+    assembled from whichever days are already cached and only the missing
+    days need to be fetched from the source. Segments that may not be
+    complete, empty ones or those from the day of the latest ingested bar
+    onwards, only live for ``short_ttl``: a day without bars is more often
+    not ingested yet than genuinely empty.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        serializer: Serializer,
+        prefix: str,
+        ttl: int = 7 * 24 * 3600,
+        short_ttl: int = 300,
+    ):
+        self.redis = client
+        self.serializer = serializer
+        self.prefix = prefix
+        self.ttl = ttl
+        self.short_ttl = short_ttl
+
+    def key(self, day: pd.Timestamp) -> str:
+        return f"{self.prefix}:{self.serializer.name}:{day.strftime('%Y-%m-%d')}"
+
+    def get_many(self, days: List[pd.Timestamp]) -> Dict[pd.Timestamp, pd.DataFrame]:
+        """Fetch every cached segment in one round trip."""
+        if not days:
+            return {}
+        payloads = self.redis.mget([self.key(day) for day in days])
+        return {
+            day: self.serializer.loads(payload)  # type: ignore
+            for day, payload in zip(days, payloads)  # type: ignore
+            if payload is not None
+        }
+
+    def set_many(
+        self,
+        segments: Dict[pd.Timestamp, pd.DataFrame],
+        complete_before: Optional[pd.Timestamp] = None,
+    ):
+        """
+        Store segments in one pipelined round trip.
+
+        Args:
+            segments (dict): Frames by day.
+            complete_before (pd.Timestamp, None): First day that may still be
+                partial, days from it onwards get ``short_ttl``.
+        """
+        if not segments:
+            return
+        with self.redis.pipeline(transaction=False) as pipe:
+            for day, df in segments.items():
+                complete = complete_before is None or day < complete_before
+                ttl = self.ttl if complete and not df.empty else self.short_ttl
+                pipe.setex(self.key(day), ttl, self.serializer.dumps(df))
+            pipe.execute()
+
+    @staticmethod
+    def split_by_day(
+        df: pd.DataFrame, days: List[pd.Timestamp]
+    ) -> Dict[pd.Timestamp, pd.DataFrame]:
+        """Split a frame into one segment per day, empty days included."""
+        return split_by_day(df, days)
+
+    @staticmethod
+    def missing_intervals(
+        days: List[pd.Timestamp],
+    ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Group missing days into [start, end) intervals of consecutive days."""
+        return day_intervals(days)
@@ -0,0 +1,123 @@
+from abc import ABC, abstractmethod
+import pickle
+import time
+import pandas as pd
+import pyarrow as pa
+
+
+class SerializerMetrics:
+    """Running totals of bytes and time spent (de)serializing cached frames."""
+
+    def __init__(self):
+        self.dumps = 0
+        self.loads = 0
+        self.bytes_stored = 0
+        self.bytes_loaded = 0
+        self.dump_seconds = 0.0
+        self.load_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class Serializer(ABC):
+    """Converts DataFrames to bytes for the Redis cache and back."""
+
+    name: str = "base"
+
+    def __init__(self):
+        self.metrics = SerializerMetrics()
+
+    def dumps(self, df: pd.DataFrame) -> bytes:
+        started = time.perf_counter()
+        payload = self._dumps(df)
+        self.metrics.dumps += 1
+        self.metrics.bytes_stored += len(payload)
+        self.metrics.dump_seconds += time.perf_counter() - started
+        return payload
+
+    def loads(self, payload: bytes) -> pd.DataFrame:
+        started = time.perf_counter()
+        df = self._loads(payload)
+        self.metrics.loads += 1
+        self.metrics.bytes_loaded += len(payload)
+        self.metrics.load_seconds += time.perf_counter() - started
+        return df
+
+    @abstractmethod
+    def _dumps(self, df: pd.DataFrame) -> bytes:
+        pass
+
+    @abstractmethod
+    def _loads(self, payload: bytes) -> pd.DataFrame:
+        pass
+
+
+class PickleSerializer(Serializer):
+    name = "pickle"
+
+    def _dumps(self, df: pd.DataFrame) -> bytes:
+        return pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _loads(self, payload: bytes) -> pd.DataFrame:
+        return pickle.loads(payload)
+
+
+class ArrowSerializer(Serializer):
+    """
+    Arrow IPC stream with buffer compression.
+
+    The pandas metadata stored in the schema restores MultiIndex columns and the
+    DatetimeIndex, and the format is stable across Python/pandas versions.
+    """
+
+    def __init__(self, compression: str = "lz4"):
+        super().__init__()
+        if compression not in ("zstd", "lz4"):
+            raise ValueError(f"Unsupported compression '{compression}'")
+        self.compression = compression
+        self.name = f"arrow-{compression}"
+        self.options = pa.ipc.IpcWriteOptions(compression=compression)
+
+    def _dumps(self, df: pd.DataFrame) -> bytes:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema, options=self.options) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def _loads(self, payload: bytes) -> pd.DataFrame:
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+def compare_serializers(
+    df: pd.DataFrame, serializers=None, repeat: int = 3
+) -> pd.DataFrame:
+    """
+    Benchmark serializers on a real frame, e.g. a ``Tiingo.get_data`` output.
+
+    Returns:
+        pd.DataFrame: Payload bytes and best dump/load seconds per serializer.
+    """
+    if serializers is None:
+        serializers = [PickleSerializer(), ArrowSerializer(), ArrowSerializer("zstd")]
+
+    rows = []
+    for serializer in serializers:
+        dump_times, load_times = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            payload = serializer.dumps(df)
+            dump_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            serializer.loads(payload)
+            load_times.append(time.perf_counter() - started)
+        rows.append(
+            {
+                "serializer": serializer.name,
+                "bytes": len(payload),
+                "dump_seconds": min(dump_times),
+                "load_seconds": min(load_times),
+            }
+        )
+    return pd.DataFrame(rows).set_index("serializer")
@@ -0,0 +1,77 @@
+import time
+import uuid
+from typing import Callable, Optional, TypeVar
+import redis
+from loguru import logger
+
+T = TypeVar("T")
+
+# Delete the lock only if we still own it, so an expired lease never frees
+# a lock that another worker has since acquired
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLease:
+    """Expiring Redis lock shared by every process using the same key."""
+
+    def __init__(self, client: redis.Redis, key: str, timeout: float = 120):
+        self.redis = client
+        self.key = key
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return bool(
+            self.redis.set(self.key, self.token, nx=True, px=int(self.timeout * 1000))
+        )
+
+    def release(self):
+        try:
+            self.redis.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to release {self.key}: {e}")
+
+
+def single_flight(
+    client: redis.Redis,
+    lock_key: str,
+    compute: Callable[[], T],
+    load: Callable[[], Optional[T]],
+    stale: Optional[T] = None,
+    lock_timeout: float = 120,
+    wait_timeout: float = 30,
+    poll_interval: float = 0.1,
+) -> T:
+    """
+    Run ``compute`` in at most one caller across processes at a time.
+
+    The caller holding the lease computes (and is expected to store) the value.
+    Everyone else is served ``stale`` immediately when available, otherwise
+    polls ``load`` until the value appears. If it does not appear within
+    ``wait_timeout`` the caller gives up waiting and computes it itself.
+    """
+    lease = RedisLease(client, lock_key, lock_timeout)
+    if lease.acquire():
+        try:
+            return compute()
+        finally:
+            lease.release()
+
+    if stale is not None:
+        logger.info(f"Serving stale value while {lock_key} is recomputed")
+        return stale
+
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        value = load()
+        if value is not None:
+            return value
+
+    logger.warning(f"Timed out after {wait_timeout}s waiting on {lock_key}")
+    return compute()
@@ -1,56 +1,566 @@
-from functools import lru_cache
+import os
 import pandas as pd
-from typing import Optional
-from data_hooks.data_hook import Datahook
-from db.timescaledb import TimescaleDB
+import redis
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from data_hooks.data_hook import Datahook, gather_bounded, run_sync
+from data_hooks.segment_cache import SegmentCache
+from data_hooks.serializers import Serializer
+from data_hooks.single_flight import single_flight
+from db.daily_bars import fetch_days, latest_bar_day
+from db.local_store import LocalBarStore
+from db.schema import (
+    AGGREGATE_VIEWS,
+    FIELD_AGGREGATIONS,
+    aggregate_view,
+    field_aggregations,
+)
+from db.timescaledb import BARS_COLUMN_TYPES, TimescaleDB
 from loguru import logger
+from sqlalchemy.exc import ProgrammingError
+from utils.bar_days import settled_before
+from utils.bar_dtypes import compact_bars, concat_bars, pivot_bar_chunks, pivot_bars
+
+SOURCE = "tiingo"
+
+# Small, frequently repeated queries run as prepared statements (name, SQL)
+RANGE_STATEMENTS = {
+    True: (
+        "tiingo_range_closed",
+        "SELECT * FROM bars WHERE source = $1 AND datetime >= $2 AND datetime <= $3",
+    ),
+    False: (
+        "tiingo_range_half_open",
+        "SELECT * FROM bars WHERE source = $1 AND datetime >= $2 AND datetime < $3",
+    ),
+}
+# get_bars returns every bucket overlapping [start_date, end_date], each one
+# whole, from the raw bars and from the aggregates alike
+BUCKET_RANGE_FILTERS = [
+    "datetime >= time_bucket(:bucket, CAST(:start_date AS TIMESTAMP))",
+    "datetime < time_bucket(:bucket, CAST(:end_date AS TIMESTAMP)) + :bucket",
+]
+LATEST_STATEMENT = (
+    "tiingo_latest",
+    "SELECT * FROM bars WHERE source = $1 AND datetime >= $2",
+)
+LATEST_TICKERS_STATEMENT = (
+    "tiingo_latest_tickers",
+    "SELECT * FROM bars WHERE source = $1 AND datetime >= $2 AND ticker = ANY($3)",
+)
 
 
 class Tiingo(Datahook):
-    def __init__(self):
-        super().__init__()  # Initialize Redis from parent class
+    # Read 1h and 1d bars from the continuous aggregates of db/schema.py
+    use_aggregates = True
+
+    def __init__(
+        self,
+        serializer: Optional[Serializer] = None,
+        live_ttl: int = 60,
+        stale_ttl: int = 300,
+        wait_timeout: float = 30,
+    ):
+        """
+        Args:
+            serializer (Serializer, None): Codec of cached frames, Arrow if None.
+            live_ttl (int): Seconds the shared frame of unsettled days is fresh.
+            stale_ttl (int): Seconds it is still served while being recomputed.
+            wait_timeout (float): Seconds to wait on another worker's query
+                before running it too.
+        """
+        super().__init__(serializer)  # Initialize Redis from parent class
+        self.live_ttl = live_ttl
+        self.stale_ttl = stale_ttl
+        self.wait_timeout = wait_timeout
         self.db = TimescaleDB()
+        self.segments = SegmentCache(self.redis, self.serializer, prefix="Tiingo:day")
+        # Optional on-disk tier shared by every process on the host
+        self.local_store = LocalBarStore() if os.getenv("BAR_STORE_PATH") else None
 
-    @Datahook.cache_df(ttl=3600)
+    @Datahook.cache_memory(live_ttl=60)
     def get_data(
         self,
         start_date: str = "2024-06-01",
         end_date: Optional[str] = None,
         cache: bool = True,
     ) -> pd.DataFrame:
-        """Get processed data from Tiingo."""
-        raw_data = self.get_raw_data(start_date, end_date)
-        return self._process_data(raw_data)
+        """
+        Get processed data from Tiingo.
 
-    @lru_cache(maxsize=128)
-    def get_raw_data(
+        With ``cache`` the range is served from per-day Redis segments, then
+        the local bar store when BAR_STORE_PATH is set, and only days found in
+        neither hit the database. The recent days that may still be filling
+        in (BARS_SETTLE_DAYS) are shared through Redis for ``live_ttl``
+        seconds and requeried by one worker at a time.
+        """
+        if not cache:
+            raw_data = self.get_raw_data(start_date, end_date)
+            return self._process_data(raw_data)
+
+        try:
+            return self._get_segmented_data(start_date, end_date)
+        except redis.RedisError as e:
+            logger.warning(f"Redis error: {e}. Returning uncached data.")
+            return self._process_data(self.get_raw_data(start_date, end_date))
+
+    def _get_segmented_data(
+        self, start_date: str, end_date: Optional[str] = None
+    ) -> pd.DataFrame:
+        start = pd.Timestamp(start_date)
+        now = pd.Timestamp.now("UTC").tz_localize(None)
+        end = pd.Timestamp(end_date) if end_date else now
+        live_start = settled_before()
+
+        # Only settled days are complete and safe to cache, see utils.bar_days
+        days = list(pd.date_range(start.normalize(), min(end, now).normalize()))
+        closed_days = [day for day in days if day < live_start]
+        segments = self.segments.get_many(closed_days)
+        missing = [day for day in closed_days if day not in segments]
+        if self.local_store is not None and missing:
+            segments.update(self.local_store.read_days(missing))
+            missing = [day for day in missing if day not in segments]
+        logger.info(
+            f"Tiingo segments: {len(segments)} cached, {len(missing)} missing days"
+        )
+
+        segments.update(self._fill_missing_days(missing))
+
+        frames: List[pd.DataFrame] = [segments[day] for day in closed_days]
+        if end >= live_start:
+            live = self._get_live_data(live_start)
+            if not live.empty:
+                frames.append(live.loc[live.index <= end])
+
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames).sort_index(axis=1)
+        return df.loc[(df.index >= start) & (df.index <= end)]
+
+    def _get_live_data(self, live_start: pd.Timestamp) -> pd.DataFrame:
+        """
+        Bars from ``live_start`` up to now, shared by every worker through Redis.
+
+        After ``live_ttl`` one worker takes a lease and requeries while the
+        others are served the previous frame, kept ``stale_ttl`` longer, or
+        wait up to ``wait_timeout`` for the new one when nothing is cached.
+        """
+        key = f"Tiingo:live:{self.serializer.name}:{live_start.date()}"
+        fresh_key = f"{key}:fresh"
+        payload, fresh = self.redis.mget(key, fresh_key)  # type: ignore
+        if payload is not None and fresh:
+            return self.serializer.loads(payload)  # type: ignore
+
+        def compute() -> pd.DataFrame:
+            now = pd.Timestamp.now("UTC").tz_localize(None)
+            df = self._process_data(self._query_range(live_start, now))
+            with self.redis.pipeline(transaction=False) as pipe:
+                pipe.setex(
+                    key, self.live_ttl + self.stale_ttl, self.serializer.dumps(df)
+                )
+                pipe.setex(fresh_key, self.live_ttl, 1)
+                pipe.execute()
+            return df
+
+        def load() -> Optional[pd.DataFrame]:
+            payload, fresh = self.redis.mget(key, fresh_key)  # type: ignore
+            if payload is not None and fresh:
+                return self.serializer.loads(payload)  # type: ignore
+            return None
+
+        return single_flight(
+            self.redis,
+            f"{key}:lock",
+            compute,
+            load,
+            stale=self.serializer.loads(payload) if payload is not None else None,  # type: ignore
+            wait_timeout=self.wait_timeout,
+        )
+
+    def _fill_missing_days(
+        self, missing: List[pd.Timestamp]
+    ) -> Dict[pd.Timestamp, pd.DataFrame]:
+        """
+        Fetch and cache missing days, one worker per interval at a time.
+
+        Concurrent callers asking for the same interval wait for the worker
+        holding the lease to publish the segments instead of re-querying.
+        """
+        filled: Dict[pd.Timestamp, pd.DataFrame] = {}
+        for interval_start, interval_end in SegmentCache.missing_intervals(missing):
+            days = list(pd.date_range(interval_start, interval_end, inclusive="left"))
+
+            def compute(days=days) -> Dict[pd.Timestamp, pd.DataFrame]:
+                fetched = self._fetch_days(days)
+                # Days ingestion has not moved past yet may still be partial
+                complete_before = self._latest_bar_day()
+                self.segments.set_many(fetched, complete_before)
+                if self.local_store is not None:
+                    for day, day_df in fetched.items():
+                        if not day_df.empty and day < complete_before:
+                            self.local_store.write_day(day, day_df)
+                return fetched
+
+            def load(days=days) -> Optional[Dict[pd.Timestamp, pd.DataFrame]]:
+                cached = self.segments.get_many(days)
+                return cached if len(cached) == len(days) else None
+
+            filled.update(
+                single_flight(
+                    self.redis,
+                    f"{self.segments.prefix}:lock:{interval_start.date()}:{interval_end.date()}",
+                    compute,
+                    load,
+                    wait_timeout=self.wait_timeout,
+                )
+            )
+        return filled
+
+    def _fetch_days(self, days: List[pd.Timestamp]) -> Dict[pd.Timestamp, pd.DataFrame]:
+        """Query whole days from the database, one query per run of consecutive days."""
+        return fetch_days(self.db, days, SOURCE)
+
+    def _latest_bar_day(self) -> pd.Timestamp:
+        """Day of the latest ingested bar, the first day that may be partial."""
+        return latest_bar_day(self.db, SOURCE)
+
+    def sync_local_store(
+        self, start_date: str, end_date: Optional[str] = None, force: bool = False
+    ) -> int:
+        """Write complete days from the database into the local bar store."""
+        if self.local_store is None:
+            raise ValueError("Set BAR_STORE_PATH to use the local bar store")
+        return self.local_store.sync(self.db, start_date, end_date, force=force)
+
+    def verify_local_store(
         self, start_date: str, end_date: Optional[str] = None
+    ) -> Dict[pd.Timestamp, str]:
+        """Compare local days with the database, returning {day: reason} mismatches."""
+        if self.local_store is None:
+            raise ValueError("Set BAR_STORE_PATH to use the local bar store")
+        return self.local_store.verify(self.db, start_date, end_date)
+
+    @Datahook.cache_memory(live_ttl=60)
+    def get_bars(
+        self,
+        start_date: str = "2024-06-01",
+        end_date: Optional[str] = None,
+        resolution: str = "1h",
+        tickers: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Get bars downsampled to ``resolution`` by the database.
+
+        Selection and OHLCV aggregation run in TimescaleDB with
+        ``time_bucket``, which returns one row per bucket and ticker with a
+        column per field; only the ticker axis is unstacked here. Resolutions
+        with a continuous aggregate (1h, 1d) are read from it, which migrations
+        and loads keep materialized over the full history; raw bars are
+        bucketed otherwise, or when the aggregate does not exist. Both return every bucket overlapping the range, whole
+        (BUCKET_RANGE_FILTERS), so the first and last rows do not depend on
+        the path taken.
+
+        Args:
+            start_date (str): Start of the range, its bucket included.
+            end_date (str, None): End of the range, its bucket included.
+            resolution (str): Bucket width, e.g. "5min", "1h", "1d".
+            tickers (list, None): Tickers to load, all if None.
+            fields (list, None): Fields to load, all in FIELD_AGGREGATIONS if None.
+
+        Returns:
+            pd.DataFrame: Pivot with (ticker, field) columns indexed by bucket start.
+        """
+        fields = fields or list(FIELD_AGGREGATIONS)
+        bucket = pd.Timedelta(resolution)
+        view = aggregate_view(bucket) if self.use_aggregates else None
+        bars = None
+        if view is not None:
+            query, params = self._build_aggregate_query(
+                view, start_date, end_date, tickers, fields
+            )
+            try:
+                bars = self.db.query_db(query, params)
+            except ProgrammingError as e:
+                logger.warning(f"Aggregate {view} unavailable, bucketing raw bars: {e}")
+
+        if bars is None:
+            query, params = self._build_bucket_query(
+                start_date, end_date, resolution, tickers, fields
+            )
+            try:
+                bars = self.db.query_db(query, params)
+            except Exception as e:
+                logger.error(f"Failed to get bars: {e}")
+                raise
+
+        bars["datetime"] = pd.to_datetime(bars["datetime"])
+        df = bars.set_index(["datetime", "ticker"])[fields].unstack("ticker")
+        df.columns = df.columns.set_names(["field", "ticker"])
+        return df.swaplevel("field", "ticker", axis=1).sort_index(axis=1)
+
+    @Datahook.cache_memory(live_ttl=60)
+    def get_raw_data(
+        self, start_date: str, end_date: Optional[str] = None, float32: bool = False
+    ) -> pd.DataFrame:
+        """
+        Get raw data from database through the bulk COPY read path.
+
+        Rows come back with compact dtypes: categorical text columns,
+        datetime64[ns] timestamps and float64, or with ``float32`` float32, values.
+        """
+        query, params = self._build_query(start_date, end_date)
+        try:
+            return compact_bars(
+                self.db.copy_query_to_df(query, BARS_COLUMN_TYPES, params=params),
+                float32=float32,
+            )
+        except Exception as e:
+            logger.error(f"Failed to get data: {e}")
+            raise
+
+    async def get_raw_data_async(
+        self,
+        start_date: str,
+        end_date: Optional[str] = None,
+        tickers: Optional[List[str]] = None,
+        float32: bool = False,
+    ) -> pd.DataFrame:
+        """Get raw data over the shared asyncpg pool, with compact dtypes."""
+        return compact_bars(
+            await self._query_async(
+                pd.Timestamp(start_date),
+                pd.Timestamp(end_date) if end_date else None,
+                tickers,
+            ),
+            float32=float32,
+        )
+
+    async def get_data_async(
+        self,
+        start_date: str = "2024-06-01",
+        end_date: Optional[str] = None,
+        tickers: Optional[List[str]] = None,
+        window: Optional[str] = None,
+        concurrency: int = 8,
+    ) -> pd.DataFrame:
+        """
+        Get processed data with one concurrent query per ticker and window.
+
+        Queries run over the shared asyncpg pool with at most ``concurrency``
+        in flight, and their rows are pivoted together by ``_process_data`` so
+        the result equals the single-query pivot.
+
+        Args:
+            start_date (str): Start of the range, inclusive.
+            end_date (str, None): End of the range, inclusive, open-ended if None.
+            tickers (list, None): One query per ticker, a single query for all if None.
+            window (str, None): Also split the range into windows, e.g. "7D".
+            concurrency (int): Maximum queries in flight.
+        """
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date) if end_date else None
+        ranges: List[Tuple[pd.Timestamp, Optional[pd.Timestamp], bool]] = [
+            (start, end, True)
+        ]
+        stop = end if end is not None else pd.Timestamp.now("UTC").tz_localize(None)
+        if window and stop > start:
+            edges = list(pd.date_range(start, stop, freq=window))
+            if edges[-1] < stop:
+                edges.append(stop)
+            # Half-open windows, only the last one keeps the requested end
+            ranges = [
+                (edges[i], edges[i + 1], False) for i in range(len(edges) - 2)
+            ] + [(edges[-2], end, True)]
+
+        frames = await gather_bounded(
+            (
+                self._query_async(
+                    range_start,
+                    range_end,
+                    [ticker] if ticker else None,
+                    end_inclusive=end_inclusive,
+                )
+                for ticker in tickers or [None]
+                for range_start, range_end, end_inclusive in ranges
+            ),
+            limit=concurrency,
+        )
+        return self._process_data(concat_bars(frames))
+
+    def get_data_concurrent(
+        self,
+        start_date: str = "2024-06-01",
+        end_date: Optional[str] = None,
+        tickers: Optional[List[str]] = None,
+        window: Optional[str] = None,
+        concurrency: int = 8,
+    ) -> pd.DataFrame:
+        """Blocking wrapper around ``get_data_async``, usable from notebooks."""
+        return run_sync(
+            self.get_data_async(start_date, end_date, tickers, window, concurrency)
+        )
+
+    async def _query_async(
+        self,
+        start: pd.Timestamp,
+        end: Optional[pd.Timestamp],
+        tickers: Optional[List[str]] = None,
+        end_inclusive: bool = True,
+    ) -> pd.DataFrame:
+        query = "SELECT * FROM bars WHERE source = $1 AND datetime >= $2"
+        params: List[Any] = [SOURCE, start.to_pydatetime()]
+        if end is not None:
+            params.append(end.to_pydatetime())
+            operator = "<=" if end_inclusive else "<"
+            query += f" AND datetime {operator} ${len(params)}"
+        if tickers:
+            params.append(list(tickers))
+            query += f" AND ticker = ANY(${len(params)})"
+        try:
+            return await self.db.query_async(query, *params)
+        except Exception as e:
+            logger.error(f"Failed to get data: {e}")
+            raise
+
+    def _query_range(
+        self, start: pd.Timestamp, end: pd.Timestamp, end_inclusive: bool = True
     ) -> pd.DataFrame:
-        """Get raw data from database."""
-        query = self._build_query(start_date, end_date)
+        """Query raw bars for a timestamp range, uncached."""
+        name, query = RANGE_STATEMENTS[end_inclusive]
         try:
-            return self.db.query_db(query)  # Using sync method instead of async
+            return self.db.query_prepared(
+                name, query, (SOURCE, start.to_pydatetime(), end.to_pydatetime())
+            )
         except Exception as e:
             logger.error(f"Failed to get data: {e}")
             raise
 
+    def get_latest_bars(
+        self, lookback: str = "1h", tickers: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Get the pivot of the most recent bars, for live pollers and signals.
+
+        Runs as a prepared statement, so repeated polls are only executed by
+        the server instead of being parsed and planned every time.
+
+        Args:
+            lookback (str): How far back from now to read, e.g. "5min", "1h".
+            tickers (list, None): Tickers to load, all if None.
+        """
+        since = pd.Timestamp.now("UTC").tz_localize(None) - pd.Timedelta(lookback)
+        if tickers:
+            name, query = LATEST_TICKERS_STATEMENT
+            params: Tuple[Any, ...] = (SOURCE, since.to_pydatetime(), list(tickers))
+        else:
+            name, query = LATEST_STATEMENT
+            params = (SOURCE, since.to_pydatetime())
+        try:
+            return self._process_data(self.db.query_prepared(name, query, params))
+        except Exception as e:
+            logger.error(f"Failed to get latest bars: {e}")
+            raise
+
+    def _process_chunks(self, chunks: Iterator[pd.DataFrame]) -> pd.DataFrame:
+        """Build the pivot incrementally from datetime-ordered raw chunks."""
+        return pivot_bar_chunks(chunks)
+
     def _process_data(self, raw_df: pd.DataFrame) -> pd.DataFrame:
         """Process raw data into pivot table format."""
-        df = raw_df[["datetime", "ticker", "field", "value"]].copy()
-        df["datetime"] = pd.to_datetime(df["datetime"])
-        df_deduped = df.drop_duplicates(subset=["datetime", "ticker", "field", "value"])
-        return pd.pivot_table(
-            df_deduped, values="value", index="datetime", columns=["ticker", "field"]
-        )
+        return pivot_bars(raw_df)
 
-    def _build_query(self, start_date: str, end_date: Optional[str] = None) -> str:
-        """Build SQL query string."""
+    def _build_bucket_query(
+        self,
+        start_date: str,
+        end_date: Optional[str],
+        resolution: str,
+        tickers: Optional[List[str]],
+        fields: List[str],
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Build the time_bucket aggregation query behind ``get_bars`` and its parameters."""
+        # Field names are checked against FIELD_AGGREGATIONS
+        aggregations = field_aggregations(fields, indent="\n                ")
+        params: Dict[str, Any] = {
+            "source": SOURCE,
+            "start_date": start_date,
+            "fields": list(fields),
+            "bucket": pd.Timedelta(resolution).to_pytimedelta(),
+        }
+        filters = ["source = :source", BUCKET_RANGE_FILTERS[0], "field = ANY(:fields)"]
+        if end_date:
+            filters.append(BUCKET_RANGE_FILTERS[1])
+            params["end_date"] = end_date
+        if tickers:
+            filters.append("ticker = ANY(:tickers)")
+            params["tickers"] = list(tickers)
+
+        # Bars are unique per key (bars_key_idx, see db/dedupe_bars.py), so
+        # volumes are summed directly
+        query = f"""
+            SELECT
+                time_bucket(:bucket, datetime) AS datetime,
+                ticker,
+                {aggregations}
+            FROM bars
+            WHERE {" AND ".join(filters)}
+            GROUP BY 1, ticker
+            ORDER BY 1, ticker
+        """
+        return query, params
+
+    def _build_aggregate_query(
+        self,
+        view: str,
+        start_date: str,
+        end_date: Optional[str],
+        tickers: Optional[List[str]],
+        fields: List[str],
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Build the query reading ``get_bars`` from a continuous aggregate."""
+        unknown = set(fields) - set(FIELD_AGGREGATIONS)
+        if unknown:
+            raise ValueError(f"No aggregation defined for fields {sorted(unknown)}")
+
+        params: Dict[str, Any] = {
+            "source": SOURCE,
+            "start_date": start_date,
+            "bucket": AGGREGATE_VIEWS[view]["bucket"].to_pytimedelta(),
+        }
+        # datetime is the bucket start here, so the same filters select buckets
+        filters = ["source = :source", BUCKET_RANGE_FILTERS[0]]
+        if end_date:
+            filters.append(BUCKET_RANGE_FILTERS[1])
+            params["end_date"] = end_date
+        if tickers:
+            filters.append("ticker = ANY(:tickers)")
+            params["tickers"] = list(tickers)
+
+        columns = ", ".join(f'"{field}"' for field in fields)
         query = f"""
+            SELECT datetime, ticker, {columns}
+            FROM {view}
+            WHERE {" AND ".join(filters)}
+            ORDER BY datetime, ticker
+        """
+        return query, params
+
+    def _build_query(
+        self,
+        start_date: str,
+        end_date: Optional[str] = None,
+        end_inclusive: bool = True,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Build SQL query string and its bound parameters."""
+        query = """
             SELECT *
             FROM bars
-            WHERE source = 'tiingo'
-            AND datetime >= '{start_date}'
+            WHERE source = :source
+            AND datetime >= :start_date
         """
+        params: Dict[str, Any] = {"source": SOURCE, "start_date": start_date}
         if end_date:
-            query += f" AND datetime <= '{end_date}'"
-        return query
+            operator = "<=" if end_inclusive else "<"
+            query += f" AND datetime {operator} :end_date"
+            params["end_date"] = end_date
+        return query, params
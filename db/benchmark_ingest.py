@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Optional
+import asyncpg
+import click
+import pandas as pd
+from loguru import logger
+from db.copy_binary import encode_copy_binary, iter_copy_binary
+from utils.bar_dtypes import BARS_COLUMNS, compact_bars, synthetic_bars
+
+BENCH_TABLE = """
+    CREATE TEMPORARY TABLE bench_bars (
+        datetime timestamp NOT NULL,
+        ticker text NOT NULL,
+        field text NOT NULL,
+        value double precision,
+        source text NOT NULL
+    )
+"""
+
+
+def to_records(df: pd.DataFrame) -> list:
+    """The previous ingestion path: Python datetimes and one tuple per row."""
+    df = df.copy()
+    for col in df.select_dtypes(include=["datetime64"]).columns:
+        df[col] = df[col].map(lambda x: x.to_pydatetime())
+    return [tuple(x) for x in df.to_numpy()]
+
+
+def _timed(rows: int, seconds: float, path: str) -> dict:
+    return {
+        "path": path,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds,
+    }
+
+
+async def _copy_paths(dsn: str, df: pd.DataFrame) -> list:
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(BENCH_TABLE)
+        results = []
+
+        started = time.perf_counter()
+        await conn.copy_records_to_table(
+            "bench_bars", records=to_records(df), columns=BARS_COLUMNS
+        )
+        results.append(_timed(len(df), time.perf_counter() - started, "copy_records"))
+
+        await conn.execute("TRUNCATE bench_bars")
+
+        async def blocks():
+            for block in iter_copy_binary(df, BARS_COLUMNS):
+                yield block
+
+        started = time.perf_counter()
+        await conn.copy_to_table(
+            "bench_bars", source=blocks(), columns=BARS_COLUMNS, format="binary"
+        )
+        results.append(_timed(len(df), time.perf_counter() - started, "copy_binary"))
+        return results
+    finally:
+        await conn.close()
+
+
+def benchmark_ingest(df: pd.DataFrame, dsn: Optional[str] = None) -> pd.DataFrame:
+    """
+    Compare ingestion rows/s of per-row tuples and binary COPY from column arrays.
+
+    Encoding is always measured; with ``dsn`` both paths are also copied into
+    a temporary table of that database, e.g. a local Postgres container.
+    """
+    started = time.perf_counter()
+    to_records(df)
+    rows = [_timed(len(df), time.perf_counter() - started, "encode_records")]
+    started = time.perf_counter()
+    encode_copy_binary(df, BARS_COLUMNS)
+    rows.append(_timed(len(df), time.perf_counter() - started, "encode_binary"))
+    if dsn:
+        rows += asyncio.run(_copy_paths(dsn, df))
+    return pd.DataFrame(rows).set_index("path")
+
+
+@click.command()
+@click.option(
+    "--dsn", default=None, help="Postgres DSN to copy into, encode only if unset."
+)
+@click.option("--tickers", default=10, help="Number of tickers.")
+@click.option("--days", default=30, help="Days of 5-minute bars.")
+def main(dsn: Optional[str], tickers: int, days: int):
+    """Benchmark bar ingestion rows/s against a local Postgres stand-in."""
+    start = pd.Timestamp("2024-01-01")
+    df = compact_bars(
+        synthetic_bars(
+            [f"ticker{i}" for i in range(tickers)],
+            ["open", "high", "low", "close", "volume", "volumeNotional", "tradesDone"],
+            str(start.date()),
+            str((start + pd.Timedelta(days=days)).date()),
+        )
+    )
+    logger.info(f"\n{benchmark_ingest(df, dsn)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import time
+import click
+import pandas as pd
+from loguru import logger
+from utils.bar_dtypes import bars_memory, compact_bars, synthetic_bars
+
+
+def benchmark_memory(
+    tickers: int = 10, start: str = "2024-01-01", end: str = "2025-01-01"
+) -> pd.DataFrame:
+    """
+    Compare the memory of long-format bars held with object and compact dtypes.
+
+    Returns:
+        pd.DataFrame: Rows, frame memory and conversion time per representation.
+    """
+    raw = synthetic_bars(
+        [f"ticker{i}" for i in range(tickers)],
+        ["open", "high", "low", "close", "volume", "volumeNotional", "tradesDone"],
+        start,
+        end,
+    )
+    raw = raw.astype({"ticker": object, "field": object, "source": object})
+    representations = {
+        "object": lambda: raw,
+        "compact": lambda: compact_bars(raw),
+        "compact_float32": lambda: compact_bars(raw, float32=True),
+    }
+    rows = []
+    for name, build in representations.items():
+        started = time.perf_counter()
+        df = build()
+        seconds = time.perf_counter() - started
+        rows.append(
+            {
+                "dtypes": name,
+                "rows": len(df),
+                "frame_mb": bars_memory(df) / 1024**2,
+                "convert_seconds": seconds,
+            }
+        )
+    result = pd.DataFrame(rows).set_index("dtypes")
+    result["vs_object"] = result["frame_mb"] / result.loc["object", "frame_mb"]
+    return result
+
+
+@click.command()
+@click.option("--tickers", default=10, help="Number of tickers.")
+@click.option("--start", default="2024-01-01", help="Start date.")
+@click.option("--end", default="2025-01-01", help="End date, exclusive.")
+def main(tickers: int, start: str, end: str):
+    """Benchmark the memory of a 5-minute multi-ticker pull of long-format bars."""
+    logger.info(f"\n{benchmark_memory(tickers, start, end)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import time
+from typing import Optional
+import click
+import pandas as pd
+from dotenv import load_dotenv
+from loguru import logger
+from db.timescaledb import BARS_COLUMN_TYPES, TimescaleDB
+
+
+def benchmark_reads(
+    db: TimescaleDB, query: str, params: Optional[dict] = None, repeat: int = 3
+) -> pd.DataFrame:
+    """
+    Compare the read paths of TimescaleDB on the same query.
+
+    Returns:
+        pd.DataFrame: Rows, frame memory and best wall time per read path.
+    """
+    paths = {
+        "read_sql_query": lambda: db.query_db(query, params),
+        "chunked": lambda: pd.concat(
+            db.query_chunks(query, params=params), ignore_index=True
+        ),
+        "copy_csv_arrow": lambda: db.copy_query_to_df(
+            query, BARS_COLUMN_TYPES, params=params
+        ),
+    }
+    rows = []
+    for name, read in paths.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            df = read()
+            timings.append(time.perf_counter() - started)
+        rows.append(
+            {
+                "path": name,
+                "rows": len(df),
+                "frame_mb": df.memory_usage(deep=True).sum() / 1024**2,
+                "seconds": min(timings),
+                "rows_per_second": len(df) / min(timings),
+            }
+        )
+    return pd.DataFrame(rows).set_index("path")
+
+
+@click.command()
+@click.option("--start", "start_date", default="2024-06-01", help="Start date.")
+@click.option("--end", "end_date", default="2024-07-01", help="End date.")
+@click.option("--repeat", default=3, help="Runs per path, best time is kept.")
+def main(start_date: str, end_date: str, repeat: int):
+    """Benchmark bar read paths against TimescaleDB."""
+    load_dotenv()
+    query = """
+        SELECT *
+        FROM bars
+        WHERE source = 'tiingo'
+        AND datetime >= :start_date AND datetime <= :end_date
+    """
+    params = {"start_date": start_date, "end_date": end_date}
+    logger.info(f"\n{benchmark_reads(TimescaleDB(), query, params, repeat)}")
+
+
+if __name__ == "__main__":
+    main()
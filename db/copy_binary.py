@@ -0,0 +1,113 @@
+from typing import Iterator, List
+import numpy as np
+import pandas as pd
+
+# PostgreSQL binary COPY framing
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + (0).to_bytes(4, "big") + (0).to_bytes(4, "big")
+COPY_TRAILER = (-1).to_bytes(2, "big", signed=True)
+
+# Postgres timestamps count microseconds from 2000-01-01
+_PG_EPOCH_US = pd.Timestamp("2000-01-01").value // 1000
+
+
+def _fixed_column(series: pd.Series):
+    """(dtype, values) of a fixed-width column in network byte order."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if series.isna().any():
+            raise ValueError(f"Column {series.name} contains nulls")
+        values = series.dt.tz_localize(None) if series.dt.tz is not None else series
+        micros = values.to_numpy(dtype="datetime64[us]").view("int64") - _PG_EPOCH_US
+        return ">i8", micros
+    if pd.api.types.is_bool_dtype(series):
+        return "?", series.to_numpy(dtype=bool)
+    if pd.api.types.is_integer_dtype(series):
+        return ">i8", series.to_numpy(dtype="int64")
+    if pd.api.types.is_float_dtype(series):
+        return ">f8", series.to_numpy(dtype="float64")
+    return None
+
+
+def iter_copy_binary(df: pd.DataFrame, columns: List[str]) -> Iterator[bytes]:
+    """
+    Encode a frame as a PostgreSQL binary COPY stream, built from column arrays.
+
+    Datetimes become timestamp, integers int8, floats float8 and booleans bool;
+    anything else (categoricals, strings) is sent as text. Rows sharing the
+    same text values have an identical layout, so each such group is written
+    as one numpy structured array instead of row by row. Row order is not
+    preserved. Text and datetime columns must not contain nulls.
+
+    Args:
+        df (pd.DataFrame): Rows to encode.
+        columns (list): Columns to encode, in table column order.
+
+    Yields:
+        bytes: Header, one block per group of rows, trailer.
+    """
+    yield COPY_HEADER
+    if df.empty:
+        yield COPY_TRAILER
+        return
+
+    fixed = {}
+    text_codes = []
+    text_values = {}
+    for column in columns:
+        encoded = _fixed_column(df[column])
+        if encoded is not None:
+            fixed[column] = encoded
+            continue
+        categorical = df[column].astype("category")
+        if (categorical.cat.codes < 0).any():
+            raise ValueError(f"Column {column} contains nulls")
+        text_codes.append(categorical.cat.codes.to_numpy(dtype="int64"))
+        text_values[column] = [
+            str(value).encode("utf-8") for value in categorical.cat.categories
+        ]
+
+    # One group per distinct combination of text values, keyed in mixed radix
+    key = np.zeros(len(df), dtype="int64")
+    radix = 1
+    for column, codes in zip(text_values, text_codes):
+        key += codes * radix
+        radix *= len(text_values[column])
+    counts = np.bincount(key, minlength=radix)
+    present = np.flatnonzero(counts)
+    group_index = np.zeros(radix, dtype="int64")
+    group_index[present] = np.arange(len(present))
+    group_of_row = group_index[key]
+
+    order = np.argsort(group_of_row, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(counts[present])])
+    for group, combo_key in enumerate(present):
+        rows = order[bounds[group] : bounds[group + 1]]
+        texts = {}
+        for column in text_values:
+            combo_key, texts[column] = divmod(combo_key, len(text_values[column]))
+        layout = [("n_fields", ">i2")]
+        for i, column in enumerate(columns):
+            if column in fixed:
+                dtype = fixed[column][0]
+                layout += [(f"len{i}", ">i4"), (f"val{i}", dtype)]
+            else:
+                size = len(text_values[column][texts[column]])
+                layout += [(f"len{i}", ">i4"), (f"val{i}", f"S{size}")]
+        block = np.empty(len(rows), dtype=np.dtype(layout))
+        block["n_fields"] = len(columns)
+        for i, column in enumerate(columns):
+            if column in fixed:
+                dtype, values = fixed[column]
+                block[f"len{i}"] = np.dtype(dtype).itemsize
+                block[f"val{i}"] = values[rows]
+            else:
+                value = text_values[column][texts[column]]
+                block[f"len{i}"] = len(value)
+                if value:
+                    block[f"val{i}"] = value
+        yield block.tobytes()
+    yield COPY_TRAILER
+
+
+def encode_copy_binary(df: pd.DataFrame, columns: List[str]) -> bytes:
+    """The whole binary COPY payload of a frame, see ``iter_copy_binary``."""
+    return b"".join(iter_copy_binary(df, columns))
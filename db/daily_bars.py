@@ -0,0 +1,82 @@
+from typing import Dict, List
+import pandas as pd
+from db.timescaledb import TimescaleDB
+from utils.bar_days import day_intervals, split_by_day
+from utils.bar_dtypes import pivot_bar_chunks
+
+DAYS_SQL = """
+    SELECT *
+    FROM bars
+    WHERE source = :source
+    AND datetime >= :start_date
+    AND datetime < :end_date
+    ORDER BY datetime
+"""
+
+LATEST_BAR_SQL = "SELECT max(datetime) AS datetime FROM bars WHERE source = :source"
+
+# Non-null, non-NaN values per day, i.e. the cells of that day's pivot
+DAY_VALUES_SQL = """
+    SELECT date_trunc('day', datetime) AS day, count(*) AS n_values
+    FROM bars
+    WHERE source = :source
+    AND datetime >= :start_date
+    AND datetime < :end_date
+    AND value <> 'NaN'
+    GROUP BY 1
+"""
+
+
+def fetch_days(
+    db: TimescaleDB, days: List[pd.Timestamp], source: str
+) -> Dict[pd.Timestamp, pd.DataFrame]:
+    """
+    Query whole days as (ticker, field) pivots, one query per run of consecutive days.
+
+    Returns:
+        dict: Pivot per requested day, empty frames for days without bars.
+    """
+    fetched: Dict[pd.Timestamp, pd.DataFrame] = {}
+    for interval_start, interval_end in day_intervals(days):
+        chunks = db.query_chunks(
+            DAYS_SQL,
+            params={
+                "source": source,
+                "start_date": str(interval_start),
+                "end_date": str(interval_end),
+            },
+        )
+        fetched.update(
+            split_by_day(
+                pivot_bar_chunks(chunks),
+                list(pd.date_range(interval_start, interval_end, inclusive="left")),
+            )
+        )
+    return fetched
+
+
+def latest_bar_day(db: TimescaleDB, source: str) -> pd.Timestamp:
+    """Day of the latest ingested bar, the first day that may still be partial."""
+    latest = db.query_db(LATEST_BAR_SQL, {"source": source})["datetime"].iloc[0]
+    if pd.isna(latest):
+        return pd.Timestamp.min
+    return pd.Timestamp(latest).normalize()
+
+
+def count_day_values(
+    db: TimescaleDB, days: List[pd.Timestamp], source: str
+) -> Dict[pd.Timestamp, int]:
+    """Number of non-NaN values stored per day, days without bars omitted."""
+    counts: Dict[pd.Timestamp, int] = {}
+    for interval_start, interval_end in day_intervals(days):
+        df = db.query_db(
+            DAY_VALUES_SQL,
+            {
+                "source": source,
+                "start_date": str(interval_start),
+                "end_date": str(interval_end),
+            },
+        )
+        for day, n_values in zip(pd.to_datetime(df["day"]), df["n_values"]):
+            counts[pd.Timestamp(day).tz_localize(None)] = int(n_values)
+    return counts
@@ -0,0 +1,114 @@
+from typing import Optional
+import click
+import pandas as pd
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import text
+from db.schema import BARS_KEY_INDEX_SQL
+from db.timescaledb import TimescaleDB
+from utils.bar_dtypes import BARS_KEY
+
+# Keep one row of every key, one time window at a time. Rows are ranked by
+# ctid, their physical position, so the survivor is the one stored last in
+# the heap; that is usually but not necessarily the last one written, since
+# inserts can reuse free space anywhere in a chunk
+DEDUPE_SQL = f"""
+    DELETE FROM bars a
+    USING bars b
+    WHERE a.datetime >= :start AND a.datetime < :end
+    AND b.datetime >= :start AND b.datetime < :end
+    AND {" AND ".join(f"a.{column} = b.{column}" for column in BARS_KEY)}
+    AND a.ctid < b.ctid
+"""
+
+
+def dedupe_bars(
+    db: TimescaleDB,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    window: str = "30D",
+    create_index: bool = True,
+    vacuum: bool = True,
+) -> int:
+    """
+    Remove duplicate bars and add the unique key the upsert path relies on.
+
+    Duplicates are deleted window by window, each in its own transaction, so
+    locks and WAL stay bounded. The range defaults to all bars.
+
+    Run this before ``python -m db.schema migrate`` on a table loaded before
+    the bars key existed: migration 002 creates the same unique index and
+    fails while duplicates remain, and until it is in place ``get_bars`` sums
+    volume over every copy of a bar.
+
+    Returns:
+        int: Number of rows deleted.
+    """
+    if start_date is None or end_date is None:
+        bounds = db.query_db(
+            "SELECT min(datetime) AS start, max(datetime) AS end FROM bars"
+        )
+        if bounds["start"].isna().all():
+            logger.info("No bars to dedupe")
+            return 0
+        start_date = start_date or str(bounds["start"].iloc[0])
+        end_date = end_date or str(
+            pd.Timestamp(bounds["end"].iloc[0]) + pd.Timedelta("1us")
+        )
+
+    edges = list(pd.date_range(start_date, end_date, freq=window))
+    if not edges or edges[-1] < pd.Timestamp(end_date):
+        edges.append(pd.Timestamp(end_date))
+
+    deleted = 0
+    for start, end in zip(edges[:-1], edges[1:]):
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                text(DEDUPE_SQL),
+                {"start": start.to_pydatetime(), "end": end.to_pydatetime()},
+            )
+        deleted += result.rowcount
+        logger.info(
+            f"{start.date()} to {end.date()}: deleted {result.rowcount} duplicates"
+        )
+
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if create_index:
+            conn.execute(text(BARS_KEY_INDEX_SQL))
+            logger.info("Unique index bars_key_idx is in place")
+        if vacuum:
+            conn.execute(text("VACUUM (ANALYZE) bars"))
+            logger.info("Vacuumed bars")
+    return deleted
+
+
+@click.command()
+@click.option(
+    "--start", "start_date", default=None, help="Start date, all bars if unset."
+)
+@click.option("--end", "end_date", default=None, help="End date, exclusive.")
+@click.option("--window", default="30D", help="Range deduped per transaction.")
+@click.option("--no-index", is_flag=True, help="Do not create the unique key index.")
+@click.option("--no-vacuum", is_flag=True, help="Skip VACUUM ANALYZE.")
+def main(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    window: str,
+    no_index: bool,
+    no_vacuum: bool,
+):
+    """Deduplicate existing bars and enforce their unique key."""
+    load_dotenv()
+    deleted = dedupe_bars(
+        TimescaleDB(),
+        start_date,
+        end_date,
+        window=window,
+        create_index=not no_index,
+        vacuum=not no_vacuum,
+    )
+    logger.info(f"Deleted {deleted} duplicate bars")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,45 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
 import click
 import pandas as pd
 from dotenv import load_dotenv
 from loguru import logger
+from sqlalchemy.exc import ProgrammingError
+from data_hooks.data_hook import run_sync
+from db.schema import SchemaManager
 from db.timescaledb import TimescaleDB
+from price_api.rate_limiter import RateLimiter
 from price_api.tiingo import TiingoAPI
+from utils.bar_days import day_intervals, settled_before
+from utils.bar_dtypes import BARS_COLUMNS, BARS_KEY, compact_bars
 from utils.nomenclature import TimeSeriesFields, Source
 
+# Last stored bar per ticker, where an incremental sync resumes. One indexed
+# newest-first lookup per ticker, so only the latest chunk is read
+LATEST_SQL = """
+    SELECT tickers.ticker, latest.datetime AS latest
+    FROM unnest(CAST(:tickers AS TEXT[])) AS tickers(ticker)
+    LEFT JOIN LATERAL (
+        SELECT datetime
+        FROM bars
+        WHERE source = :source AND field = 'close' AND ticker = tickers.ticker
+        ORDER BY datetime DESC
+        LIMIT 1
+    ) latest ON TRUE
+"""
+
+# Close bars per ticker and day over an explicit gap-check range
+COVERAGE_SQL = """
+    SELECT ticker, time_bucket(INTERVAL '1 day', datetime) AS day, count(*) AS bars
+    FROM bars
+    WHERE source = :source AND field = 'close' AND ticker = ANY(:tickers)
+    AND datetime >= :start AND datetime < :end
+    GROUP BY ticker, day
+"""
+
 
 def create_date_ranges(start_date: str, end_date: str, freq: str = "15D") -> list:
     """Create date ranges ensuring full coverage including end date"""
@@ -22,53 +56,521 @@ def create_date_ranges(start_date: str, end_date: str, freq: str = "15D") -> lis
     return list(zip(dates[:-1], dates[1:]))
 
 
-start_date = "2023-06-01"
-end_date = "2024-01-01"
-ticker = "btcusd"
+def melt_prices(prices: pd.DataFrame) -> pd.DataFrame:
+    """Turn a Tiingo price frame into long-format bars with compact dtypes."""
+    prices_df_melt = prices.melt(
+        id_vars=["date", "ticker"], var_name="field", value_name="value"
+    )
+    prices_df_melt[TimeSeriesFields.SOURCE] = Source.TIINGO
+    prices_df_melt = prices_df_melt.rename(columns={"date": TimeSeriesFields.DATETIME})
+    prices_df_melt["datetime"] = pd.to_datetime(
+        prices_df_melt["datetime"]
+    ).dt.tz_localize(None)
+    return compact_bars(prices_df_melt[BARS_COLUMNS])
+
+
+class Checkpoint:
+    """
+    Append-only log of fetched backfill windows.
+
+    A window is recorded only after its rows are in the database, so a
+    crashed or interrupted run resumes with the windows that were not. A
+    window that came back empty may be a transient API gap rather than no
+    data, so it is recorded with a ``retry_after`` time and fetched again once
+    that has passed. Later records of a window replace earlier ones.
+    """
+
+    def __init__(self, path: str, empty_retry: str = "1D"):
+        self.path = path
+        self.empty_retry = pd.Timedelta(empty_retry)
+        self.entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["window"]] = entry
+
+    @staticmethod
+    def key(
+        ticker: str, start: pd.Timestamp, end: pd.Timestamp, resolution: str
+    ) -> str:
+        return f"{ticker}|{start.date()}|{end.date()}|{resolution}"
+
+    def is_done(self, key: str) -> bool:
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        retry_after = entry.get("retry_after")
+        return retry_after is None or pd.Timestamp(retry_after) > _utcnow()
+
+    def mark_done(self, key: str, rows: int):
+        entry: Dict[str, Any] = {"window": key, "rows": rows}
+        if not rows:
+            entry["retry_after"] = str(_utcnow() + self.empty_retry)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[key] = entry
+
+    def done_days(self, ticker: str, resolution: str) -> Set[pd.Timestamp]:
+        """Days inside the done windows of a ticker, short or empty ones included."""
+        days: Set[pd.Timestamp] = set()
+        for key in self.entries:
+            window_ticker, start, end, window_resolution = key.split("|")
+            if (
+                window_ticker == ticker
+                and window_resolution == resolution
+                and self.is_done(key)
+            ):
+                days.update(pd.date_range(start, end, inclusive="left"))
+        return days
+
+
+def _utcnow() -> pd.Timestamp:
+    return pd.Timestamp.now("UTC").tz_localize(None)
+
+
+def missing_windows(
+    coverage: pd.DataFrame,
+    tickers: List[str],
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    resolution: str = "5min",
+    window: str = "15D",
+    min_coverage: float = 0.9,
+    skip: Optional[Dict[str, Set[pd.Timestamp]]] = None,
+) -> List[Tuple[str, pd.Timestamp, pd.Timestamp]]:
+    """
+    Turn per-day bar counts into the windows that still need fetching.
 
-# Generate date ranges with validation
-date_range = create_date_ranges(start_date, end_date)
-logger.info(f"Created {len(date_range)} date ranges")
-logger.info(f"First range: {date_range[0][0]} to {date_range[0][1]}")
-logger.info(f"Last range: {date_range[-1][0]} to {date_range[-1][1]}")
+    A day is missing when it holds fewer than ``min_coverage`` of the bars
+    expected at ``resolution``. Consecutive missing days form one interval,
+    split into ``window`` sized fetches.
 
-upload_df = pd.DataFrame()
-for start, end in date_range:
-    try:
-        start_date_str = start.strftime("%Y-%m-%d")
-        end_date_str = end.strftime("%Y-%m-%d")
-        logger.info(f"Processing {start_date_str} to {end_date_str} for {ticker}")
+    Args:
+        coverage (pd.DataFrame): ticker, day, bars rows from COVERAGE_SQL.
+        tickers (list): Tickers to sync.
+        start (pd.Timestamp): First day to check.
+        end (pd.Timestamp): Day after the last day to check.
+        skip (dict, None): Days per ticker never reported missing, e.g. days
+            already fetched that came back short.
 
-        # Fetch prices from TiingoAPI
-        prices: pd.DataFrame = TiingoAPI().get_prices(
-            tickers=ticker, start_date=start_date_str, end_date=end_date_str
+    Returns:
+        list: (ticker, start, end) windows.
+    """
+    expected = pd.Timedelta("1D") / pd.Timedelta(resolution)
+    days = pd.date_range(start.normalize(), end.normalize(), inclusive="left")
+    counts = (
+        coverage.assign(
+            day=pd.to_datetime(coverage["day"]).dt.tz_localize(None)
+        ).set_index(["ticker", "day"])["bars"]
+        if not coverage.empty
+        else pd.Series(dtype="int64")
+    )
+    skip = skip or {}
+    windows = []
+    for ticker in tickers:
+        have = (
+            counts.xs(ticker, level="ticker").reindex(days, fill_value=0)
+            if ticker in counts.index.get_level_values(0)
+            else pd.Series(0, index=days)
         )
+        skipped = skip.get(ticker, set())
+        missing = [
+            day
+            for day in have.index[have < min_coverage * expected]
+            if day not in skipped
+        ]
+        for interval_start, interval_end in day_intervals(missing):
+            windows += [
+                (ticker, window_start, window_end)
+                for window_start, window_end in create_date_ranges(
+                    str(interval_start), str(interval_end), window
+                )
+            ]
+    return windows
 
-        # Transform the data
-        prices_df_melt = prices.melt(
-            id_vars=["date", "ticker"], var_name="field", value_name="value"
+
+class TiingoBackfill:
+    """
+    Concurrent, resumable backfill of Tiingo bars into TimescaleDB.
+
+    Every (ticker, window) pair is fetched and written independently, with at
+    most ``concurrency`` in flight and API calls paced by a shared rate limiter.
+    Windows are upserted on the bars key, so shared boundary dates and reruns
+    never duplicate bars. ``plan_sync`` narrows the work to the bars since the
+    last stored one, plus the gaps of an explicit range. Once done, the
+    continuous aggregates are refreshed over the windows that wrote rows, as
+    their policies never revisit older dates.
+    """
+
+    def __init__(
+        self,
+        tickers: List[str],
+        start_date: str,
+        end_date: str,
+        resolution: str = "5min",
+        window: str = "15D",
+        concurrency: int = 4,
+        rate: float = 2.0,
+        retries: int = 3,
+        checkpoint_path: Optional[str] = "tiingo_backfill.jsonl",
+        empty_retry: str = "1D",
+        refresh_aggregates: bool = True,
+    ):
+        self.tickers = tickers
+        self.start = pd.Timestamp(start_date)
+        self.end = pd.Timestamp(end_date)
+        self.resolution = resolution
+        self.window = window
+        self.work = [
+            (ticker, start, end)
+            for ticker in tickers
+            for start, end in create_date_ranges(start_date, end_date, window)
+        ]
+        self.concurrency = concurrency
+        self.retries = retries
+        self.limiter = RateLimiter(rate, burst=concurrency)
+        self.checkpoint = (
+            Checkpoint(checkpoint_path, empty_retry) if checkpoint_path else None
         )
-        prices_df_melt[TimeSeriesFields.SOURCE] = Source.TIINGO
-        prices_df_melt = prices_df_melt.rename(
-            columns={"date": TimeSeriesFields.DATETIME}
+        self.refresh_aggregates = refresh_aggregates
+        self.api = TiingoAPI()
+        self.db = TimescaleDB()
+        self.rows = 0
+        self.done = 0
+        self.failed: List[str] = []
+        self.written: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
+
+    def plan_sync(
+        self,
+        gaps_start: Optional[str] = None,
+        gaps_end: Optional[str] = None,
+        min_coverage: float = 0.9,
+    ) -> List[Tuple[str, pd.Timestamp, pd.Timestamp]]:
+        """
+        Replace the planned windows with what an incremental sync needs.
+
+        Each ticker is fetched from the day of its last stored bar up to the
+        end, or from the start date when it has no bars yet. With a gap range,
+        days in it holding fewer than ``min_coverage`` of the expected bars are
+        fetched too, except days in windows the checkpoint records as already
+        fetched, so illiquid pairs, outages and pre-listing dates are not
+        refetched on every run.
+
+        Args:
+            gaps_start (str, None): First day to check for gaps, none if None.
+            gaps_end (str, None): Day after the last day to check, the sync
+                end if None.
+            min_coverage (float): Share of a day's expected bars below which
+                the day is refetched.
+        """
+        latest = self.db.query_db(
+            LATEST_SQL, {"source": Source.TIINGO, "tickers": list(self.tickers)}
         )
-        prices_df_melt["datetime"] = pd.to_datetime(
-            prices_df_melt["datetime"]
-        ).dt.tz_localize(None)
-        upload_df = pd.concat([upload_df, prices_df_melt])
-    except Exception as e:
-        logger.error(e)
-        continue
-
-# Validate complete date coverage
-date_range = pd.date_range(start=start_date, end=end_date, freq="1D")
-missing_dates = set(date_range) - set(upload_df["datetime"].dt.normalize().unique())
-if missing_dates:
-    logger.warning(f"Missing dates: {sorted(missing_dates)}")
-
-
-await TimescaleDB().copy_dataframe_to_table(
-    df=upload_df,
-    table_name="bars",
-    columns=["datetime", "ticker", "field", "value", "source"],
+        since = {
+            ticker: pd.Timestamp(timestamp).normalize()
+            for ticker, timestamp in zip(latest["ticker"], latest["latest"])
+            if not pd.isna(timestamp)
+        }
+        tail = []
+        for ticker in self.tickers:
+            first = since.get(ticker, self.start.normalize())
+            if first < self.end:
+                tail += [
+                    (ticker, start, end)
+                    for start, end in create_date_ranges(
+                        str(first), str(self.end), self.window
+                    )
+                ]
+
+        gaps = []
+        if gaps_start is not None:
+            start = pd.Timestamp(gaps_start)
+            end = pd.Timestamp(gaps_end) if gaps_end else self.end
+            coverage = self.db.query_db(
+                COVERAGE_SQL,
+                {
+                    "source": Source.TIINGO,
+                    "tickers": list(self.tickers),
+                    "start": start.to_pydatetime(),
+                    "end": end.to_pydatetime(),
+                },
+            )
+            # Days from the tail start are fetched anyway
+            skip = {
+                ticker: set(
+                    pd.date_range(since.get(ticker, self.start.normalize()), end)
+                )
+                | (
+                    self.checkpoint.done_days(ticker, self.resolution)
+                    if self.checkpoint is not None
+                    else set()
+                )
+                for ticker in self.tickers
+            }
+            gaps = missing_windows(
+                coverage,
+                self.tickers,
+                start,
+                end,
+                self.resolution,
+                self.window,
+                min_coverage,
+                skip,
+            )
+        logger.info(f"Sync plan: {len(gaps)} gap windows, {len(tail)} tail windows")
+        self.work = gaps + tail
+        return self.work
+
+    def pending(self) -> List[Tuple[str, pd.Timestamp, pd.Timestamp]]:
+        if self.checkpoint is None:
+            return list(self.work)
+        return [
+            (ticker, start, end)
+            for ticker, start, end in self.work
+            if not self.checkpoint.is_done(
+                Checkpoint.key(ticker, start, end, self.resolution)
+            )
+        ]
+
+    async def run(self) -> dict:
+        pending = self.pending()
+        total = len(self.work)
+        logger.info(
+            f"Backfilling {len(pending)} of {total} windows "
+            f"({total - len(pending)} already checkpointed)"
+        )
+        self.started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(ticker: str, start: pd.Timestamp, end: pd.Timestamp):
+            async with semaphore:
+                await self._load_window(ticker, start, end, len(pending))
+
+        await asyncio.gather(*(bounded(*window) for window in pending))
+        if self.refresh_aggregates and self.written:
+            await asyncio.to_thread(self._refresh_aggregates)
+
+        elapsed = time.monotonic() - self.started
+        stats = {
+            "windows": self.done,
+            "failed": len(self.failed),
+            "rows": self.rows,
+            "seconds": elapsed,
+            "rows_per_second": self.rows / elapsed if elapsed else 0.0,
+        }
+        logger.info(f"Backfill finished: {stats}")
+        if self.failed:
+            logger.warning(f"Failed windows, rerun to retry: {self.failed}")
+        return stats
+
+    async def _load_window(
+        self, ticker: str, start: pd.Timestamp, end: pd.Timestamp, n_pending: int
+    ):
+        key = Checkpoint.key(ticker, start, end, self.resolution)
+        for attempt in range(1, self.retries + 1):
+            try:
+                await self.limiter.acquire()
+                prices = await asyncio.to_thread(
+                    self.api.get_prices,
+                    tickers=ticker,
+                    start_date=start.strftime("%Y-%m-%d"),
+                    end_date=end.strftime("%Y-%m-%d"),
+                    resample_freq=self.resolution,
+                )
+                rows = 0
+                if prices.empty:
+                    logger.warning(f"No data for {key}")
+                else:
+                    rows = await self.db.upsert_dataframe(
+                        df=melt_prices(prices),
+                        table_name="bars",
+                        columns=BARS_COLUMNS,
+                        key_columns=BARS_KEY,
+                    )
+                if rows:
+                    # Tiingo includes the end date, which windows share
+                    self.written.append((start, end + pd.Timedelta(days=1)))
+                # Windows reaching unsettled days are refetched on every run
+                if self.checkpoint is not None and end <= settled_before():
+                    self.checkpoint.mark_done(key, rows)
+                break
+            except Exception as e:
+                logger.warning(f"{key} attempt {attempt}/{self.retries} failed: {e}")
+                if attempt == self.retries:
+                    self.failed.append(key)
+                    return
+                await asyncio.sleep(2**attempt)
+
+        self.rows += rows
+        self.done += 1
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed
+        eta = (n_pending - self.done - len(self.failed)) / rate if rate else 0.0
+        logger.info(
+            f"{self.done}/{n_pending} windows, {self.rows} rows, "
+            f"{self.rows / elapsed:.0f} rows/s, ETA {eta:.0f}s"
+        )
+
+    def _refresh_aggregates(self):
+        """Refresh the aggregates once per run of overlapping written windows."""
+        ranges: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
+        for start, end in sorted(self.written):
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+            else:
+                ranges.append((start, end))
+        manager = SchemaManager(self.db)
+        try:
+            for start, end in ranges:
+                manager.refresh_range(start, end)
+                logger.info(f"Refreshed aggregates from {start} to {end}")
+        except ProgrammingError as e:
+            logger.warning(f"Aggregates not refreshed, run db.schema migrate: {e}")
+
+
+@click.group()
+def cli():
+    """Load Tiingo bars into TimescaleDB."""
+    load_dotenv()
+
+
+def _run(backfill: TiingoBackfill):
+    stats = run_sync(backfill.run())
+    if stats["failed"]:
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.option(
+    "--tickers", "-t", required=True, multiple=True, help="Ticker, repeatable."
+)
+@click.option("--start", "start_date", required=True, help="Start date, YYYY-MM-DD.")
+@click.option("--end", "end_date", required=True, help="End date, YYYY-MM-DD.")
+@click.option("--resolution", default="5min", help="Tiingo resampleFreq.")
+@click.option("--window", default="15D", help="Range fetched per API call.")
+@click.option("--concurrency", default=4, help="Windows in flight.")
+@click.option("--rate", default=2.0, help="Maximum API calls per second.")
+@click.option("--retries", default=3, help="Attempts per window.")
+@click.option(
+    "--checkpoint",
+    "checkpoint_path",
+    default="tiingo_backfill.jsonl",
+    help="File recording completed windows, reused to resume.",
+)
+@click.option(
+    "--empty-retry", default="1D", help="Wait before refetching an empty window."
+)
+@click.option(
+    "--no-refresh", is_flag=True, help="Do not refresh the continuous aggregates."
 )
+def backfill(
+    tickers: Tuple[str, ...],
+    start_date: str,
+    end_date: str,
+    resolution: str,
+    window: str,
+    concurrency: int,
+    rate: float,
+    retries: int,
+    checkpoint_path: str,
+    empty_retry: str,
+    no_refresh: bool,
+):
+    """Backfill a fixed range of Tiingo bars."""
+    _run(
+        TiingoBackfill(
+            list(tickers),
+            start_date,
+            end_date,
+            resolution=resolution,
+            window=window,
+            concurrency=concurrency,
+            rate=rate,
+            retries=retries,
+            checkpoint_path=checkpoint_path,
+            empty_retry=empty_retry,
+            refresh_aggregates=not no_refresh,
+        )
+    )
+
+
+@cli.command()
+@click.option(
+    "--tickers", "-t", required=True, multiple=True, help="Ticker, repeatable."
+)
+@click.option(
+    "--start",
+    "start_date",
+    required=True,
+    help="First day fetched for tickers without any bars yet.",
+)
+@click.option("--resolution", default="5min", help="Tiingo resampleFreq.")
+@click.option("--window", default="15D", help="Largest range fetched per API call.")
+@click.option(
+    "--gaps-from", default=None, help="Also fill gaps from this day, none if unset."
+)
+@click.option(
+    "--gaps-to", default=None, help="Day after the last one checked for gaps."
+)
+@click.option(
+    "--min-coverage",
+    default=0.9,
+    help="Share of a day's expected bars below which a gap day is refetched.",
+)
+@click.option("--concurrency", default=4, help="Windows in flight.")
+@click.option("--rate", default=2.0, help="Maximum API calls per second.")
+@click.option("--retries", default=3, help="Attempts per window.")
+@click.option(
+    "--checkpoint",
+    "checkpoint_path",
+    default="tiingo_sync.jsonl",
+    help="File recording fetched gap windows, so they are not refetched.",
+)
+@click.option(
+    "--empty-retry", default="7D", help="Wait before refetching an empty gap window."
+)
+@click.option(
+    "--no-refresh", is_flag=True, help="Do not refresh the continuous aggregates."
+)
+def sync(
+    tickers: Tuple[str, ...],
+    start_date: str,
+    resolution: str,
+    window: str,
+    gaps_from: Optional[str],
+    gaps_to: Optional[str],
+    min_coverage: float,
+    concurrency: int,
+    rate: float,
+    retries: int,
+    checkpoint_path: str,
+    empty_retry: str,
+    no_refresh: bool,
+):
+    """Fetch the bars since the last stored one, and optionally fill gaps."""
+    tomorrow = pd.Timestamp.now("UTC").tz_localize(None).normalize() + pd.Timedelta(
+        days=1
+    )
+    backfill = TiingoBackfill(
+        list(tickers),
+        start_date,
+        str(tomorrow.date()),
+        resolution=resolution,
+        window=window,
+        concurrency=concurrency,
+        rate=rate,
+        retries=retries,
+        checkpoint_path=checkpoint_path,
+        empty_retry=empty_retry,
+        refresh_aggregates=not no_refresh,
+    )
+    backfill.plan_sync(gaps_from, gaps_to, min_coverage)
+    _run(backfill)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,293 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+import click
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from loguru import logger
+from db.daily_bars import count_day_values, fetch_days, latest_bar_day
+from db.timescaledb import TimescaleDB
+from utils.bar_days import settled_before, settled_days
+
+# Superseded versions of a day are kept this long for reads still using them
+VERSION_GRACE_SECONDS = 600
+
+
+class LocalBarStore:
+    """
+    Day-partitioned on-disk columnar store of the Tiingo pivot.
+
+    Layout is ``<root>/<YYYY-MM-DD> -> .v-<YYYY-MM-DD>-<id>/<ticker>/{datetime,
+    <field>}.npy``: every write goes to a new version directory and the day
+    symlink is then swapped to it atomically, so a reader resolves the link
+    once and sees one complete, immutable version. Superseded versions are
+    deleted after ``VERSION_GRACE_SECONDS``. Arrays are opened with
+    ``mmap_mode="r"`` so every process on the host reads the same page-cached
+    files instead of pulling bars over the network. Returned columns are
+    views of the mapped arrays, not copies, unless several tickers with
+    different timestamps have to be aligned. Only days known to be complete (see
+    ``utils.bar_days``) are written, so a day's presence means it is complete.
+    """
+
+    def __init__(self, root: Optional[str] = None, source: str = "tiingo"):
+        self.root = root or os.getenv("BAR_STORE_PATH")
+        if not self.root:
+            raise ValueError("Missing BAR_STORE_PATH for the local bar store")
+        self.source = source
+        os.makedirs(self.root, exist_ok=True)
+
+    def day_path(self, day: pd.Timestamp) -> str:
+        return os.path.join(self.root, day.strftime("%Y-%m-%d"))
+
+    def has_day(self, day: pd.Timestamp) -> bool:
+        return os.path.isdir(self.day_path(day))
+
+    def days(self) -> List[pd.Timestamp]:
+        """Every complete day in the store."""
+        return sorted(
+            pd.Timestamp(name)
+            for name in os.listdir(self.root)
+            if not name.startswith(".")
+        )
+
+    def write_day(self, day: pd.Timestamp, df: pd.DataFrame):
+        """
+        Write one day of the (ticker, field) pivot, replacing any previous copy.
+
+        Concurrent writers each publish their own version and the last swap
+        wins, which is harmless as they hold the same bars.
+        """
+        name = day.strftime("%Y-%m-%d")
+        version_dir = tempfile.mkdtemp(prefix=f".v-{name}-", dir=self.root)
+        try:
+            if not df.empty:
+                for ticker in df.columns.get_level_values("ticker").unique():
+                    ticker_df = df[ticker].dropna(how="all")
+                    ticker_dir = os.path.join(version_dir, ticker)
+                    os.makedirs(ticker_dir)
+                    np.save(
+                        os.path.join(ticker_dir, "datetime.npy"),
+                        ticker_df.index.values.astype("datetime64[ns]").view("int64"),
+                    )
+                    for field in ticker_df.columns:
+                        np.save(
+                            os.path.join(ticker_dir, f"{field}.npy"),
+                            ticker_df[field].to_numpy(dtype="float64"),
+                        )
+            self._supersede(day)
+            link = os.path.join(self.root, f".link-{uuid.uuid4().hex}")
+            os.symlink(os.path.basename(version_dir), link)
+            os.replace(link, self.day_path(day))
+        except Exception:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            raise
+        self._remove_old_versions(day)
+
+    def _supersede(self, day: pd.Timestamp):
+        """Start the grace period of the version about to be replaced."""
+        path = self.day_path(day)
+        try:
+            if not os.path.islink(path):
+                # Stores written before versioning hold days as plain directories
+                name = day.strftime("%Y-%m-%d")
+                legacy = os.path.join(self.root, f".v-{name}-{uuid.uuid4().hex}")
+                os.rename(path, legacy)
+                os.utime(legacy)
+            else:
+                os.utime(os.path.realpath(path))
+        except FileNotFoundError:
+            pass  # No previous version, or another writer moved it first
+
+    def _remove_old_versions(self, day: pd.Timestamp):
+        """Delete versions of a day unlinked for longer than the grace period."""
+        name = day.strftime("%Y-%m-%d")
+        current = os.path.basename(os.path.realpath(self.day_path(day)))
+        cutoff = time.time() - VERSION_GRACE_SECONDS
+        for entry in os.scandir(self.root):
+            if not entry.name.startswith(f".v-{name}-") or entry.name == current:
+                continue
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except FileNotFoundError:
+                continue  # Removed by another writer
+
+    def read_day(
+        self, day: pd.Timestamp, tickers: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Read one day back as a (ticker, field) pivot from memory-mapped arrays.
+
+        Raises:
+            FileNotFoundError: The day is not in the store.
+        """
+        try:
+            return self._read_version(self._version_dir(day), tickers)
+        except FileNotFoundError:
+            # Reads outliving the grace period retry against the current version
+            return self._read_version(self._version_dir(day), tickers)
+
+    def _version_dir(self, day: pd.Timestamp) -> str:
+        version_dir = os.path.realpath(self.day_path(day))
+        if not os.path.isdir(version_dir):
+            raise FileNotFoundError(f"{day.date()} is not in the local store")
+        return version_dir
+
+    def _read_version(
+        self, day_dir: str, tickers: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        frames = []
+        for ticker in sorted(os.listdir(day_dir)):
+            if tickers is not None and ticker not in tickers:
+                continue
+            ticker_dir = os.path.join(day_dir, ticker)
+            index = pd.DatetimeIndex(
+                np.load(os.path.join(ticker_dir, "datetime.npy"), mmap_mode="r").view(
+                    "datetime64[ns]"
+                ),
+                name="datetime",
+            )
+            columns = {
+                (ticker, name[: -len(".npy")]): np.load(
+                    os.path.join(ticker_dir, name), mmap_mode="r"
+                )
+                for name in sorted(os.listdir(ticker_dir))
+                if name != "datetime.npy"
+            }
+            # Columns stay views of the mapped arrays
+            ticker_df = pd.DataFrame(columns, index=index, copy=False)
+            ticker_df.columns = ticker_df.columns.set_names(["ticker", "field"])
+            frames.append(ticker_df)
+        if not frames:
+            return pd.DataFrame()
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, axis=1).sort_index()
+
+    def read_days(
+        self, days: List[pd.Timestamp], tickers: Optional[List[str]] = None
+    ) -> Dict[pd.Timestamp, pd.DataFrame]:
+        """Read every requested day that is present in the store."""
+        found = {}
+        for day in days:
+            try:
+                found[day] = self.read_day(day, tickers)
+            except FileNotFoundError:
+                continue
+        return found
+
+    def count_values(self, day: pd.Timestamp) -> int:
+        """Number of non-NaN values stored for a day, 0 if it is not in the store."""
+        try:
+            day_df = self.read_day(day)
+        except FileNotFoundError:
+            return 0
+        return int(day_df.notna().to_numpy().sum())
+
+    def sync(
+        self,
+        db: TimescaleDB,
+        start_date: str,
+        end_date: Optional[str] = None,
+        force: bool = False,
+    ) -> int:
+        """
+        Write complete days from the database into the store.
+
+        Only settled days before the day of the latest ingested bar are
+        written, and days without bars are skipped. A day already in the store
+        is rewritten when its value count differs from the database, so a day
+        stored while still partial is repaired on the next sync.
+
+        Returns:
+            int: Number of days written.
+        """
+        complete_before = min(settled_before(), latest_bar_day(db, self.source))
+        days = [
+            day for day in settled_days(start_date, end_date) if day < complete_before
+        ]
+        expected = count_day_values(db, days, self.source)
+        days = [day for day in days if expected.get(day)]
+        if not force:
+            days = [day for day in days if self.count_values(day) != expected[day]]
+        written = 0
+        for day, day_df in fetch_days(db, days, self.source).items():
+            if not day_df.empty:
+                self.write_day(day, day_df)
+                written += 1
+        return written
+
+    def verify(
+        self, db: TimescaleDB, start_date: str, end_date: Optional[str] = None
+    ) -> Dict[pd.Timestamp, str]:
+        """Compare stored days with the database, returning {day: reason} mismatches."""
+        mismatches: Dict[pd.Timestamp, str] = {}
+        days = settled_days(start_date, end_date)
+        source = fetch_days(db, days, self.source)
+        for day in days:
+            expected = source[day].dropna(axis=1, how="all")
+            if not self.has_day(day):
+                if not expected.empty:
+                    mismatches[day] = "missing from local store"
+                continue
+            local = self.read_day(day).dropna(axis=1, how="all")
+            if expected.empty and local.empty:
+                continue
+            if not expected.columns.equals(local.columns):
+                mismatches[day] = "columns differ"
+            elif not expected.index.equals(local.index):
+                mismatches[day] = f"{len(local)} local rows vs {len(expected)} source"
+            elif not np.array_equal(
+                local.to_numpy(), expected.to_numpy(), equal_nan=True
+            ):
+                mismatches[day] = "values differ"
+        return mismatches
+
+
+@click.group()
+def cli():
+    """Manage the local memory-mapped bar store."""
+    load_dotenv()
+
+
+@cli.command()
+@click.option("--start", "start_date", required=True, help="First day, YYYY-MM-DD.")
+@click.option(
+    "--end",
+    "end_date",
+    default=None,
+    help="Last day, defaults to the last settled one.",
+)
+@click.option(
+    "--force", is_flag=True, help="Rewrite days already in the store and complete."
+)
+def sync(start_date: str, end_date: Optional[str], force: bool):
+    """Refresh the store from TimescaleDB."""
+    written = LocalBarStore().sync(TimescaleDB(), start_date, end_date, force=force)
+    logger.info(f"Synced {written} days into the local store")
+
+
+@cli.command()
+@click.option("--start", "start_date", required=True, help="First day, YYYY-MM-DD.")
+@click.option(
+    "--end",
+    "end_date",
+    default=None,
+    help="Last day, defaults to the last settled one.",
+)
+def verify(start_date: str, end_date: Optional[str]):
+    """Check the store against TimescaleDB and list mismatching days."""
+    mismatches = LocalBarStore().verify(TimescaleDB(), start_date, end_date)
+    if mismatches:
+        for day, reason in mismatches.items():
+            logger.warning(f"{day.date()}: {reason}")
+        raise SystemExit(1)
+    logger.info("Local store matches TimescaleDB")
+
+
+if __name__ == "__main__":
+    cli()
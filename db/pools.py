@@ -0,0 +1,110 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Hashable
+import asyncpg
+import redis
+from loguru import logger
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+# One pooled client per configuration, shared by every hook in the process
+_engines: Dict[Hashable, Engine] = {}
+_redis_pools: Dict[Hashable, redis.ConnectionPool] = {}
+_asyncpg_pools: Dict[Hashable, asyncpg.Pool] = {}
+_lock = threading.Lock()
+
+
+def get_engine(conn_str: str, **connect_args: Any) -> Engine:
+    """
+    Get the process-wide SQLAlchemy engine for a connection string.
+
+    Creating the engine opens no connection; the pool connects lazily on first
+    checkout and pings connections before handing them out. Pool size, overflow
+    and recycle time come from TIMESCALE_POOL_SIZE, TIMESCALE_MAX_OVERFLOW and
+    TIMESCALE_POOL_RECYCLE.
+    """
+    key = (conn_str, tuple(sorted(connect_args.items())))
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(
+                conn_str,
+                connect_args=connect_args,
+                pool_size=int(os.getenv("TIMESCALE_POOL_SIZE", 5)),
+                max_overflow=int(os.getenv("TIMESCALE_MAX_OVERFLOW", 10)),
+                pool_recycle=int(os.getenv("TIMESCALE_POOL_RECYCLE", 1800)),
+                pool_pre_ping=True,
+            )
+            _engines[key] = engine
+        return engine
+
+
+def get_redis_pool(
+    host: str = "localhost", port: int = 6379, db: int = 0
+) -> redis.ConnectionPool:
+    """Get the process-wide Redis connection pool, sized by REDIS_MAX_CONNECTIONS."""
+    key = (host, port, db)
+    with _lock:
+        pool = _redis_pools.get(key)
+        if pool is None:
+            max_connections = os.getenv("REDIS_MAX_CONNECTIONS")
+            pool = redis.ConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                max_connections=int(max_connections) if max_connections else None,
+            )
+            _redis_pools[key] = pool
+        return pool
+
+
+async def get_asyncpg_pool(dsn: str) -> asyncpg.Pool:
+    """
+    Get the asyncpg pool for a DSN on the running event loop.
+
+    asyncpg pools are bound to the loop that created them, so pools are keyed
+    by loop as well as DSN. Sizes come from TIMESCALE_ASYNC_POOL_MIN and
+    TIMESCALE_ASYNC_POOL_MAX.
+    """
+    key = (dsn, id(asyncio.get_running_loop()))
+    pool = _asyncpg_pools.get(key)
+    if pool is None:
+        pool = await asyncpg.create_pool(
+            dsn,
+            min_size=int(os.getenv("TIMESCALE_ASYNC_POOL_MIN", 1)),
+            max_size=int(os.getenv("TIMESCALE_ASYNC_POOL_MAX", 10)),
+        )
+        # Another task may have created one while we were connecting
+        existing = _asyncpg_pools.setdefault(key, pool)
+        if existing is not pool:
+            await pool.close()
+            pool = existing
+    return pool
+
+
+async def close_asyncpg_pools():
+    """Close the asyncpg pools created on the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _asyncpg_pools if key[1] == loop_id]:
+        await _asyncpg_pools.pop(key).close()
+
+
+def _reset_after_fork():
+    """
+    Drop pools inherited from the parent so a forked worker opens its own.
+
+    Engines are disposed with ``close=False`` so the parent's sockets are left
+    untouched, the inherited asyncpg pools belong to the parent's event loop.
+    """
+    global _lock
+    _lock = threading.Lock()
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    for pool in _redis_pools.values():
+        pool.reset()
+    _asyncpg_pools.clear()
+    logger.debug(f"Reset connection pools in forked worker {os.getpid()}")
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,308 @@
+from typing import Dict, List, Optional, Tuple
+import click
+import pandas as pd
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import text
+from db.timescaledb import TimescaleDB
+from utils.bar_dtypes import BARS_KEY
+
+# How each Tiingo field is aggregated when bars are bucketed to a coarser resolution
+FIELD_AGGREGATIONS = {
+    "open": "first(value, datetime)",
+    "high": "max(value)",
+    "low": "min(value)",
+    "close": "last(value, datetime)",
+    "volume": "sum(value)",
+    "volumeNotional": "sum(value)",
+    "tradesDone": "sum(value)",
+}
+
+# Continuous aggregates of bars: view name -> bucket, refresh window and schedule
+AGGREGATE_VIEWS = {
+    "bars_1h": {
+        "bucket": pd.Timedelta("1h"),
+        "start_offset": "3 days",
+        "end_offset": "1 hour",
+        "schedule": "30 minutes",
+    },
+    "bars_1d": {
+        "bucket": pd.Timedelta("1D"),
+        "start_offset": "30 days",
+        "end_offset": "1 day",
+        "schedule": "1 hour",
+    },
+}
+
+# Conflict target of TimescaleDB.upsert_dataframe
+BARS_KEY_INDEX_SQL = (
+    f"CREATE UNIQUE INDEX IF NOT EXISTS bars_key_idx ON bars ({', '.join(BARS_KEY)})"
+)
+
+# The unique index cannot be built over duplicates, fail with the fix instead
+BARS_KEY_PRECONDITION_SQL = f"""
+    DO $$
+    BEGIN
+        IF to_regclass('bars_key_idx') IS NULL AND EXISTS (
+            SELECT 1 FROM bars GROUP BY {", ".join(BARS_KEY)} HAVING count(*) > 1
+        ) THEN
+            RAISE EXCEPTION 'bars holds duplicate keys, run python -m db.dedupe_bars first';
+        END IF;
+    END
+    $$
+"""
+
+BARS_CHUNK_INTERVAL = "7 days"
+BARS_COMPRESS_AFTER = "30 days"
+
+
+def field_aggregations(fields: List[str], indent: str = "\n    ") -> str:
+    """Select list with one aggregated column per field, rows filtered by field."""
+    unknown = set(fields) - set(FIELD_AGGREGATIONS)
+    if unknown:
+        raise ValueError(f"No aggregation defined for fields {sorted(unknown)}")
+    return ("," + indent).join(
+        f"{FIELD_AGGREGATIONS[field]} FILTER (WHERE field = '{field}') AS \"{field}\""
+        for field in fields
+    )
+
+
+def aggregate_view(bucket: pd.Timedelta) -> Optional[str]:
+    """Continuous aggregate holding bars at ``bucket``, if there is one."""
+    for view, config in AGGREGATE_VIEWS.items():
+        if config["bucket"] == bucket:
+            return view
+    return None
+
+
+def _aggregate_migration(view: str) -> List[str]:
+    config = AGGREGATE_VIEWS[view]
+    bucket_seconds = int(config["bucket"].total_seconds())
+    return [
+        f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+        SELECT
+            time_bucket(INTERVAL '{bucket_seconds} seconds', datetime) AS datetime,
+            ticker,
+            source,
+            {field_aggregations(list(FIELD_AGGREGATIONS), indent=chr(10) + " " * 12)}
+        FROM bars
+        GROUP BY 1, ticker, source
+        WITH NO DATA
+        """,
+        f"CREATE INDEX IF NOT EXISTS {view}_ticker_datetime_idx ON {view} (ticker, datetime DESC)",
+        f"""
+        SELECT add_continuous_aggregate_policy(
+            '{view}',
+            start_offset => INTERVAL '{config["start_offset"]}',
+            end_offset => INTERVAL '{config["end_offset"]}',
+            schedule_interval => INTERVAL '{config["schedule"]}',
+            if_not_exists => TRUE
+        )
+        """,
+    ]
+
+
+# Applied in order, each once; names are recorded in schema_migrations
+MIGRATIONS: List[Tuple[str, List[str]]] = [
+    (
+        "001_bars_hypertable",
+        [
+            "CREATE EXTENSION IF NOT EXISTS timescaledb",
+            """
+            CREATE TABLE IF NOT EXISTS bars (
+                datetime TIMESTAMP NOT NULL,
+                ticker TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value DOUBLE PRECISION,
+                source TEXT NOT NULL
+            )
+            """,
+            f"""
+            SELECT create_hypertable(
+                'bars',
+                'datetime',
+                chunk_time_interval => INTERVAL '{BARS_CHUNK_INTERVAL}',
+                if_not_exists => TRUE,
+                migrate_data => TRUE
+            )
+            """,
+        ],
+    ),
+    (
+        "002_bars_indexes",
+        [
+            BARS_KEY_PRECONDITION_SQL,
+            BARS_KEY_INDEX_SQL,
+            "CREATE INDEX IF NOT EXISTS bars_ticker_field_datetime_idx "
+            "ON bars (ticker, field, datetime DESC)",
+        ],
+    ),
+    (
+        "003_bars_compression",
+        [
+            """
+            ALTER TABLE bars SET (
+                timescaledb.compress,
+                timescaledb.compress_segmentby = 'ticker, field, source',
+                timescaledb.compress_orderby = 'datetime DESC'
+            )
+            """,
+            f"""
+            SELECT add_compression_policy(
+                'bars', INTERVAL '{BARS_COMPRESS_AFTER}', if_not_exists => TRUE
+            )
+            """,
+        ],
+    ),
+    ("004_bars_1h_aggregate", _aggregate_migration("bars_1h")),
+    ("005_bars_1d_aggregate", _aggregate_migration("bars_1d")),
+    # Aggregates start empty and policies only cover their start_offset
+    (
+        "006_refresh_aggregates",
+        [
+            f"CALL refresh_continuous_aggregate('{view}', NULL, NULL)"
+            for view in AGGREGATE_VIEWS
+        ],
+    ),
+]
+
+
+class SchemaManager:
+    """
+    Create and migrate the bars schema.
+
+    Statements run in autocommit, as continuous aggregates cannot be created
+    inside a transaction, and every statement is idempotent so a migration
+    interrupted halfway can simply be applied again.
+    """
+
+    def __init__(self, db: Optional[TimescaleDB] = None):
+        self.db = db or TimescaleDB()
+
+    def applied(self) -> List[str]:
+        with self.db.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        name TEXT PRIMARY KEY,
+                        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                    """))
+            rows = conn.execute(text("SELECT name FROM schema_migrations"))
+            return [row[0] for row in rows]
+
+    def pending(self) -> List[Tuple[str, List[str]]]:
+        applied = set(self.applied())
+        return [(name, sql) for name, sql in MIGRATIONS if name not in applied]
+
+    def migrate(self) -> List[str]:
+        """Apply every pending migration in order, returning their names."""
+        names = []
+        for name, statements in self.pending():
+            logger.info(f"Applying {name}")
+            with self.db.engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT"
+            ) as conn:
+                for statement in statements:
+                    conn.execute(text(statement))
+                conn.execute(
+                    text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+                    {"name": name},
+                )
+            names.append(name)
+        return names
+
+    def refresh(
+        self, view: str, start: Optional[str] = None, end: Optional[str] = None
+    ):
+        """Materialize a continuous aggregate over a range, all of it by default."""
+        if view not in AGGREGATE_VIEWS:
+            raise ValueError(f"Unknown aggregate {view}")
+        with self.db.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(
+                text(
+                    f"CALL refresh_continuous_aggregate('{view}', "
+                    "CAST(:start AS TIMESTAMP), CAST(:end AS TIMESTAMP))"
+                ),
+                {"start": start, "end": end},
+            )
+
+    def refresh_range(self, start: pd.Timestamp, end: pd.Timestamp):
+        """Materialize every aggregate over the buckets overlapping [start, end)."""
+        for view, config in AGGREGATE_VIEWS.items():
+            bucket = config["bucket"]
+            self.refresh(view, str(start.floor(bucket)), str(end.ceil(bucket)))
+
+    def status(self) -> Dict[str, pd.DataFrame]:
+        """Chunks and compression of bars, plus the aggregates and their jobs."""
+        return {
+            "chunks": self.db.query_db("""
+                SELECT chunk_name, range_start, range_end, is_compressed
+                FROM timescaledb_information.chunks
+                WHERE hypertable_name = 'bars'
+                ORDER BY range_start
+                """),
+            "jobs": self.db.query_db(
+                """
+                SELECT job_id, proc_name, hypertable_name, schedule_interval, config
+                FROM timescaledb_information.jobs
+                WHERE hypertable_name = 'bars'
+                OR hypertable_name IN (
+                    SELECT materialization_hypertable_name
+                    FROM timescaledb_information.continuous_aggregates
+                    WHERE view_name = ANY(:views)
+                )
+                """,
+                {"views": list(AGGREGATE_VIEWS)},
+            ),
+        }
+
+
+@click.group()
+def cli():
+    """Manage the TimescaleDB schema of bars."""
+    load_dotenv()
+
+
+@cli.command()
+def plan():
+    """Print the SQL of every migration without connecting."""
+    for name, statements in MIGRATIONS:
+        click.echo(f"-- {name}")
+        for statement in statements:
+            click.echo(f"{statement.strip()};\n")
+
+
+@cli.command()
+def migrate():
+    """Apply pending migrations."""
+    applied = SchemaManager().migrate()
+    logger.info(f"Applied {applied or 'nothing, schema is up to date'}")
+
+
+@cli.command()
+@click.argument("view", type=click.Choice(list(AGGREGATE_VIEWS)))
+@click.option("--start", default=None, help="Start of the range, all if unset.")
+@click.option("--end", default=None, help="End of the range, all if unset.")
+def refresh(view: str, start: Optional[str], end: Optional[str]):
+    """Materialize a continuous aggregate, e.g. after a backfill."""
+    SchemaManager().refresh(view, start, end)
+    logger.info(f"Refreshed {view}")
+
+
+@cli.command()
+def status():
+    """Show applied migrations, chunks and background jobs."""
+    manager = SchemaManager()
+    logger.info(f"Applied migrations: {manager.applied()}")
+    for name, df in manager.status().items():
+        logger.info(f"{name}:\n{df}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,10 +1,15 @@
-import asyncpg
 import pandas as pd
-from typing import List
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
 from loguru import logger
 import os
 import psycopg2
 from sqlalchemy import create_engine, text
+from db.copy_binary import iter_copy_binary
+from db.pools import get_asyncpg_pool, get_engine
+from utils.bar_dtypes import BARS_COLUMN_TYPES, BARS_COLUMNS
 
 
 import os
@@ -28,10 +33,13 @@ class TimescaleDB:
                 "Missing required environment variables for TimescaleDB connection"
             )
 
-        # Build connection string
+        # Build connection string, the engine is shared per connection string
         conn_str = f"postgresql://{self.user}:{quote_plus(self.password)}@{self.host}:{self.port}/{self.database}"  # type: ignore
-        self.engine = create_engine(conn_str, connect_args={"sslmode": "require"})
+        self.engine = get_engine(conn_str, sslmode="require")
+        self.dsn = f"{conn_str}?sslmode=require"
 
+    def ping(self):
+        """Check the database is reachable."""
         try:
             with self.engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
@@ -39,17 +47,196 @@ class TimescaleDB:
             logger.error(f"Failed to connect to TimescaleDB: {str(e)}")
             raise
 
-    def query_db(self, query: str) -> pd.DataFrame:
-        """Execute SQL query and return results as DataFrame."""
+    def query_db(
+        self, query: str, params: Optional[Dict[str, Any]] = None
+    ) -> pd.DataFrame:
+        """
+        Execute SQL query and return results as DataFrame.
+
+        Args:
+            query (str): SQL query with ``:name`` placeholders.
+            params (dict, None): Values bound to the placeholders by the driver.
+        """
+        if not query:
+            raise ValueError("Query string cannot be empty")
+
+        try:
+            return pd.read_sql_query(text(query), self.engine, params=params)
+        except Exception as e:
+            logger.error(f"Query failed: {str(e)}")
+            raise
+
+    def query_chunks(
+        self,
+        query: str,
+        chunksize: int = 100_000,
+        as_arrow: bool = False,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+        """
+        Execute SQL query through a server-side cursor and yield result chunks.
+
+        Rows are streamed ``chunksize`` at a time, so peak memory follows the
+        chunk size rather than the full result.
+
+        Args:
+            query (str): SQL query.
+            chunksize (int): Rows per chunk.
+            as_arrow (bool): Yield pyarrow RecordBatches instead of DataFrames.
+            params (dict, None): Values bound to ``:name`` placeholders.
+        """
         if not query:
             raise ValueError("Query string cannot be empty")
 
         try:
-            return pd.read_sql_query(query, self.engine)
+            with self.engine.connect().execution_options(
+                stream_results=True, max_row_buffer=chunksize
+            ) as conn:
+                result = conn.execute(text(query), params or {})
+                columns = list(result.keys())
+                for rows in result.partitions(chunksize):
+                    df = pd.DataFrame.from_records(rows, columns=columns)
+                    if as_arrow:
+                        yield pa.RecordBatch.from_pandas(df, preserve_index=False)
+                    else:
+                        yield df
         except Exception as e:
             logger.error(f"Query failed: {str(e)}")
             raise
 
+    def copy_query_to_arrow(
+        self,
+        query: str,
+        column_types: Optional[Dict[str, pa.DataType]] = None,
+        spool_bytes: int = 256 * 1024**2,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> pa.Table:
+        """
+        Bulk read a query with ``COPY ... TO STDOUT`` into typed Arrow columns.
+
+        The server streams the result as CSV which Arrow's multithreaded reader
+        decodes straight into columnar buffers, avoiding per-row Python objects.
+        Output is spooled to disk past ``spool_bytes``.
+
+        Args:
+            query (str): SELECT statement to export.
+            column_types (dict, None): Arrow type per column, inferred if None.
+            spool_bytes (int): In-memory buffer size before spilling to disk.
+            params (dict, None): Values bound to ``:name`` placeholders.
+        """
+        if not query:
+            raise ValueError("Query string cannot be empty")
+
+        # COPY takes no bind parameters, so the driver quotes them client side
+        compiled = text(query.strip().rstrip(";")).compile(dialect=self.engine.dialect)
+        conn = self.engine.raw_connection()
+        try:
+            with tempfile.SpooledTemporaryFile(max_size=spool_bytes) as buffer:
+                with conn.cursor() as cursor:
+                    select_sql = cursor.mogrify(
+                        str(compiled), {**compiled.params, **(params or {})}
+                    ).decode()
+                    cursor.copy_expert(
+                        f"COPY ({select_sql}) TO STDOUT WITH (FORMAT csv, HEADER true)",
+                        buffer,
+                    )
+                buffer.seek(0)
+                return pa_csv.read_csv(
+                    buffer,
+                    convert_options=pa_csv.ConvertOptions(
+                        column_types=column_types or {}
+                    ),
+                )
+        except Exception as e:
+            logger.error(f"COPY query failed: {str(e)}")
+            raise
+        finally:
+            conn.close()
+
+    def copy_query_to_df(
+        self,
+        query: str,
+        column_types: Optional[Dict[str, pa.DataType]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> pd.DataFrame:
+        """Bulk read a query via ``copy_query_to_arrow``, text columns as categoricals."""
+        return self.copy_query_to_arrow(query, column_types, params=params).to_pandas()
+
+    async def query_async(
+        self,
+        query: str,
+        *params: Any,
+        empty_columns: Sequence[str] = BARS_COLUMNS,
+    ) -> pd.DataFrame:
+        """
+        Execute SQL query on the shared asyncpg pool and return results as DataFrame.
+
+        ``fetch`` goes through asyncpg's per-connection statement cache, so
+        repeated query shapes are only prepared once per pooled connection.
+
+        Args:
+            query (str): SQL query with ``$1``, ``$2``, ... placeholders.
+            *params: Positional values for the placeholders.
+            empty_columns (sequence): Columns of an empty result, which carries
+                no records to take them from.
+        """
+        if not query:
+            raise ValueError("Query string cannot be empty")
+
+        pool = await get_asyncpg_pool(self.dsn)
+        try:
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(query, *params)
+        except Exception as e:
+            logger.error(f"Async query failed: {str(e)}")
+            raise
+        columns = list(rows[0].keys()) if rows else list(empty_columns)
+        return pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns)
+
+    def query_prepared(
+        self, name: str, query: str, params: Sequence[Any] = ()
+    ) -> pd.DataFrame:
+        """
+        Execute a server-side prepared statement and return results as DataFrame.
+
+        The statement is prepared once per pooled connection and only executed
+        afterwards, so repeated small queries skip parsing and planning. Which
+        statements a connection holds is tracked in its ``info`` dict, which
+        lives as long as the underlying DBAPI connection.
+
+        Args:
+            name (str): Statement name, unique per distinct SQL text.
+            query (str): SQL query with ``$1``, ``$2``, ... placeholders.
+            params (sequence): Positional values for the placeholders.
+        """
+        if not query:
+            raise ValueError("Query string cannot be empty")
+
+        conn = self.engine.raw_connection()
+        try:
+            prepared = conn.info.setdefault("prepared_statements", {})
+            with conn.cursor() as cursor:
+                if prepared.get(name) != query:
+                    if name in prepared:
+                        cursor.execute(f"DEALLOCATE {name}")
+                    cursor.execute(f"PREPARE {name} AS {query}")
+                    prepared[name] = query
+                if params:
+                    placeholders = ", ".join(["%s"] * len(params))
+                    cursor.execute(f"EXECUTE {name} ({placeholders})", tuple(params))
+                else:
+                    cursor.execute(f"EXECUTE {name}")
+                columns = [column.name for column in cursor.description]
+                rows = cursor.fetchall()
+            return pd.DataFrame.from_records(rows, columns=columns)
+        except Exception as e:
+            logger.error(f"Prepared query {name} failed: {str(e)}")
+            # Session state is unknown after a failure, drop the connection
+            conn.invalidate()
+            raise
+        finally:
+            conn.close()
+
     async def copy_dataframe_to_table(
         self,
         df: pd.DataFrame,
@@ -57,30 +244,122 @@ class TimescaleDB:
         columns: List[str],
         schema: str = "public",
     ) -> int:
-        CONNECTION = os.getenv("TIMESCALE_DB_CONN")
+        """
+        Upload DataFrame using native PostgreSQL binary COPY.
+
+        The COPY stream is encoded from the frame's column arrays by
+        ``iter_copy_binary`` and streamed to the server block by block, so no
+        Python object is built per row. Column dtypes must match the table:
+        datetimes to timestamp, floats to float8, integers to int8, anything
+        else to text.
+
+        Args:
+            df (pd.DataFrame): Rows to upload, columns in ``columns`` order.
+            table_name (str): Target table.
+            columns (list): Target table columns.
+            schema (str): Target schema.
+
+        Returns:
+            int: Number of rows copied.
+        """
+        CONNECTION = os.getenv("TIMESCALE_DB_CONN") or self.dsn
 
-        """Upload DataFrame using native PostgreSQL COPY."""
         if df.empty:
             raise ValueError("DataFrame is empty")
         if len(columns) != len(df.columns):
             raise ValueError("Column count mismatch")
 
-        # Convert datetime64 columns to Python datetime
-        df = df.copy()
-        for col in df.select_dtypes(include=["datetime64"]).columns:
-            df[col] = df[col].map(lambda x: x.to_pydatetime())
-
-        # Convert to records
-        records = [tuple(x) for x in df.to_numpy()]
+        async def blocks():
+            for block in iter_copy_binary(df, list(df.columns)):
+                yield block
 
-        conn = await asyncpg.connect(CONNECTION)
-        try:
-            total_rows = 0
+        pool = await get_asyncpg_pool(CONNECTION)
+        async with pool.acquire() as conn:
             async with conn.transaction():
-                total_rows = await conn.copy_records_to_table(
-                    table_name, records=records, schema_name=schema, columns=columns
+                status = await conn.copy_to_table(
+                    table_name,
+                    source=blocks(),
+                    columns=columns,
+                    schema_name=schema,
+                    format="binary",
                 )
-            print(f"Copied {total_rows} rows to {schema}.{table_name}")
-            return total_rows
-        finally:
-            await conn.close()
+        total_rows = int(status.split()[-1])
+        logger.info(f"Copied {total_rows} rows to {schema}.{table_name}")
+        return total_rows
+
+    async def upsert_dataframe(
+        self,
+        df: pd.DataFrame,
+        table_name: str,
+        columns: List[str],
+        key_columns: List[str],
+        schema: str = "public",
+        batch_rows: int = 500_000,
+    ) -> int:
+        """
+        Idempotently upload DataFrame through a staging table.
+
+        Each batch is binary COPYed into a temporary staging table and merged
+        with ``INSERT ... ON CONFLICT (key_columns) DO UPDATE``, so re-running
+        a load leaves one row per key with the latest values. The target needs
+        a unique index on ``key_columns``.
+
+        Args:
+            df (pd.DataFrame): Rows to upload, columns in ``columns`` order.
+            table_name (str): Target table.
+            columns (list): Target table columns.
+            key_columns (list): Columns of the target's unique key.
+            schema (str): Target schema.
+            batch_rows (int): Rows merged per transaction.
+
+        Returns:
+            int: Number of rows inserted or updated.
+        """
+        CONNECTION = os.getenv("TIMESCALE_DB_CONN") or self.dsn
+
+        if df.empty:
+            raise ValueError("DataFrame is empty")
+        if len(columns) != len(df.columns):
+            raise ValueError("Column count mismatch")
+
+        staging = f"{table_name}_staging"
+        column_list = ", ".join(columns)
+        key_list = ", ".join(key_columns)
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}"
+            for column in columns
+            if column not in key_columns
+        )
+        on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        # DISTINCT ON: a key may only be touched once per INSERT ... ON CONFLICT
+        merge_sql = f"""
+            INSERT INTO {schema}.{table_name} ({column_list})
+            SELECT DISTINCT ON ({key_list}) {column_list}
+            FROM {staging}
+            ORDER BY {key_list}
+            ON CONFLICT ({key_list}) {on_conflict}
+        """
+
+        total_rows = 0
+        pool = await get_asyncpg_pool(CONNECTION)
+        async with pool.acquire() as conn:
+            for start in range(0, len(df), batch_rows):
+                batch = df.iloc[start : start + batch_rows]
+
+                async def blocks():
+                    for block in iter_copy_binary(batch, list(batch.columns)):
+                        yield block
+
+                async with conn.transaction():
+                    await conn.execute(
+                        f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} "
+                        f"(LIKE {schema}.{table_name} INCLUDING DEFAULTS) "
+                        "ON COMMIT DELETE ROWS"
+                    )
+                    await conn.copy_to_table(
+                        staging, source=blocks(), columns=columns, format="binary"
+                    )
+                    status = await conn.execute(merge_sql)
+                total_rows += int(status.split()[-1])
+        logger.info(f"Upserted {total_rows} rows into {schema}.{table_name}")
+        return total_rows
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from pandas import Series, DataFrame, DatetimeIndex
 import plotly.graph_objects as go
-from typing import List, Union, cast
+from typing import List, Optional, Union, cast
+from models.ledger import EquityCurve, TradeLedger
 
 
 # 1. DataHandler class for managing data
@@ -41,33 +43,61 @@ class SignalGenerator:
 
 
 # 3. Position class to represent each open position
-@dataclass
+@dataclass(slots=True, eq=False)
 class Position:
     entry_index: int
     entry_price: float
     size: int
     fee: float
+    trade_id: int = -1
 
 
 # 4. PositionManager class for managing open positions
 class PositionManager:
-    def __init__(self, max_positions: int, fee: float):
+    def __init__(
+        self, max_positions: int, fee: float, ledger_capacity: Optional[int] = 256
+    ):
+        if ledger_capacity is not None and ledger_capacity < 1:
+            raise ValueError(
+                f"ledger_capacity must be at least 1, got {ledger_capacity}; "
+                "pass None to disable the ledger"
+            )
         self.max_positions = max_positions
         self.fee = fee
         self.positions: List[Position] = []
+        # Streaming runs pass None to keep memory constant and skip the ledger
+        self.ledger = (
+            TradeLedger(ledger_capacity) if ledger_capacity is not None else None
+        )
 
-    def open_position(self, index: int, entry_price: float, size: int) -> Position:
+    def open_position(
+        self, index: int, entry_price: float, size: int, bar: int = -1
+    ) -> Position:
         fee_amount = entry_price * self.fee
+        trade_id = -1
+        if self.ledger is not None:
+            trade_id = self.ledger.open_trade(bar, entry_price, size, fee_amount)
         position = Position(
-            entry_index=index, entry_price=entry_price, size=size, fee=fee_amount
+            entry_index=index,
+            entry_price=entry_price,
+            size=size,
+            fee=fee_amount,
+            trade_id=trade_id,
         )
         self.positions.append(position)
         return position
 
-    def close_position(self, position: Position, exit_price: float) -> float:
+    def close_position(
+        self, position: Position, exit_price: float, bar: int = -1
+    ) -> float:
         fee_amount = exit_price * self.fee
         total_exit_value = exit_price - fee_amount
         profit = (total_exit_value - position.entry_price) * position.size
+        if self.ledger is not None:
+            self.ledger.close_trade(
+                position.trade_id, bar, exit_price, fee_amount, profit
+            )
+        # Positions compare by identity, so removal never runs field equality
         self.positions.remove(position)
         return profit
 
@@ -102,8 +132,126 @@ class Portfolio:
         self.realized_pnls += pnl
 
 
-# 6. Backtester class for running the backtest
+# 6. Array engine running the same bar logic over contiguous NumPy arrays
+MARKET_ARRAY_ROWS = ("open", "high", "low", "close", "entry", "is_last")
+
+
+def market_arrays(data: DataFrame, signal: Series) -> np.ndarray:
+    """
+    Stack aligned OHLC, entry flags and last-bar flags into one contiguous block.
+
+    Args:
+        data (DataFrame): OHLC frame already aligned with ``signal``.
+        signal (Series): Signal series, entries are bars where it equals 1.
+
+    Returns:
+        np.ndarray: float64 array of shape (len(MARKET_ARRAY_ROWS), n_bars).
+    """
+    index = data.index
+    block = np.empty((len(MARKET_ARRAY_ROWS), len(data)), dtype="float64")
+    for row, field in enumerate(("open", "high", "low", "close")):
+        block[row] = data[field].to_numpy(dtype="float64")
+    block[4] = (signal == 1).to_numpy(dtype=bool)
+    # The loop engine compares bar labels against the last position
+    block[5] = np.asarray(index == len(data) - 1, dtype=bool)
+    return block
+
+
+def simulate_arrays(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    entries: np.ndarray,
+    is_last: np.ndarray,
+    initial_capital: float = 100,
+    max_positions: int = 5,
+    profit_target: float = 0.05,
+    stop_loss: float = 0.02,
+    fee: float = 0.0015,
+) -> dict:
+    """
+    Run the backtest bar logic with integer indexing over plain arrays.
+
+    Mirrors ``Backtester`` bar for bar (including the order in which open
+    positions are visited and closed) so results match the loop engine exactly.
+
+    Args:
+        open_, high, low, close (np.ndarray): OHLC prices per bar.
+        entries (np.ndarray): Boolean array, True where the signal equals 1.
+        is_last (np.ndarray): Boolean array, True where the bar label marks the final bar.
+
+    Returns:
+        dict: cash, realized pnl, open positions, the trade ledger and the
+            per-bar equity curve.
+    """
+    n = len(open_)
+    # Python floats are much faster to index and compare than NumPy scalars
+    opens, highs, lows, closes = (
+        np.asarray(a, dtype="float64").tolist() for a in (open_, high, low, close)
+    )
+    entry_flags = np.asarray(entries, dtype=bool).tolist()
+    last_flags = np.asarray(is_last, dtype=bool).tolist()
+
+    cash = initial_capital
+    total_value = initial_capital
+    realized = 0.0
+    positions: List[Position] = []
+    ledger = TradeLedger()
+    equity = EquityCurve(n)
+
+    for i in range(n):
+        if entry_flags[i] and len(positions) < max_positions:
+            open_price = opens[i]
+            if cash >= open_price:
+                entry_fee = open_price * fee
+                trade_id = ledger.open_trade(i, open_price, 1, entry_fee)
+                positions.append(Position(i, open_price, 1, entry_fee, trade_id))
+                cash += -open_price
+
+        current_high, current_low = highs[i], lows[i]
+        k = 0
+        # Visit positions like a list iterator that is mutated while iterating:
+        # removing the current element shifts the next one under the cursor
+        while k < len(positions):
+            position = positions[k]
+            target_price = position.entry_price * (1 + profit_target)
+            stop_loss_price = position.entry_price * (1 - stop_loss)
+            if current_high >= target_price:
+                exit_price = target_price
+            elif current_low <= stop_loss_price:
+                exit_price = stop_loss_price
+            elif last_flags[i]:
+                exit_price = closes[i]
+            else:
+                k += 1
+                continue
+            exit_fee = exit_price * fee
+            profit = (exit_price - exit_fee - position.entry_price) * position.size
+            ledger.close_trade(position.trade_id, i, exit_price, exit_fee, profit)
+            del positions[k]
+            realized += profit
+            cash += profit
+            k += 1
+
+        value = total_value
+        for position in positions:
+            value += position.entry_price * position.size
+        equity.record(i, realized, value - cash - realized)
+
+    return {
+        "cash": cash,
+        "realized_pnl": realized,
+        "positions": positions,
+        "ledger": ledger,
+        "equity": equity,
+    }
+
+
+# 7. Backtester class for running the backtest
 class Backtester:
+    ENGINES = ("loop", "array")
+
     def __init__(
         self,
         data: pd.DataFrame,
@@ -113,7 +261,13 @@ class Backtester:
         profit_target=0.05,
         stop_loss=0.02,
         fee=0.0015,
+        engine: str = "loop",
     ):
+        if engine not in self.ENGINES:
+            raise ValueError(
+                f"Unknown engine '{engine}', expected one of {self.ENGINES}"
+            )
+        self.engine = engine
         aligned_data, aligned_signal = data.align(signal, join="inner", axis=0)
         self.data_handler = DataHandler(aligned_data)
         self.signal_generator = SignalGenerator(aligned_signal)
@@ -121,13 +275,23 @@ class Backtester:
         self.portfolio = Portfolio(initial_capital)
         self.profit_target = profit_target
         self.stop_loss = stop_loss
-        self.pnl_evolution = pd.DataFrame(
-            columns=["realized_pnl", "cumulative_pnl", "date"]
-        ).set_index("date")
+        self.equity = EquityCurve(len(aligned_data))
+
+    @property
+    def pnl_evolution(self) -> DataFrame:
+        return self.equity.to_frame(self.data_handler.index)
+
+    @property
+    def trades(self) -> DataFrame:
+        """Every fill recorded during the backtest, one row per trade."""
+        return self.position_manager.ledger.to_frame(self.data_handler.index)
 
     def backtest(self) -> dict:
+        if self.engine == "array":
+            return self._backtest_arrays()
+
         bt_data = self.data_handler.get_data()
-        for i in bt_data.index:
+        for bar, i in enumerate(bt_data.index):
             print(
                 f"Index {i}: Signal = {self.signal_generator.get_signal(i)}, Cash = {self.portfolio.get_cash()}"
             )
@@ -137,21 +301,46 @@ class Backtester:
                 and len(self.position_manager.get_open_positions())
                 < self.position_manager.max_positions
             ):
-                self._open_position(i)
+                self._open_position(i, bar)
+
+            self._check_positions(i, bar)
+            self._track_pnl(bar)
+
+        return self._results()
 
-            self._check_positions(i)
-            self._track_pnl(i)
+    def _backtest_arrays(self) -> dict:
+        """Run the array engine and load its final state back into the managers."""
+        bt_data = self.data_handler.get_data()
+        index = bt_data.index
+        positions = self.position_manager
+
+        state = simulate_arrays(
+            *market_arrays(bt_data, self.signal_generator.signal),
+            initial_capital=self.portfolio.get_cash(),
+            max_positions=positions.max_positions,
+            profit_target=self.profit_target,
+            stop_loss=self.stop_loss,
+            fee=positions.fee,
+        )
 
+        # Array engine tracks positions by bar number, expose them by label
+        for position in state["positions"]:
+            position.entry_index = index[position.entry_index]
+        positions.positions = state["positions"]
+        positions.ledger = state["ledger"]
+        self.portfolio.cash = state["cash"]
+        self.portfolio.realized_pnls = state["realized_pnl"]
+        self.equity = state["equity"]
         return self._results()
 
-    def _open_position(self, index: int):
+    def _open_position(self, index: int, bar: int = -1):
         open_price = self.data_handler.get_open(index)
         if self.portfolio.get_cash() >= open_price:
-            position = self.position_manager.open_position(index, open_price, 1)
+            position = self.position_manager.open_position(index, open_price, 1, bar)
             self.portfolio.update_cash(-open_price)
             print(f"Position opened at index {index} with price {open_price}")
 
-    def _check_positions(self, index: int):
+    def _check_positions(self, index: int, bar: int = -1):
         current_high = self.data_handler.get_high(index)
         current_low = self.data_handler.get_low(index)
         close_price = self.data_handler.get_close(index)
@@ -161,21 +350,23 @@ class Backtester:
             stop_loss_price = position.entry_price * (1 - self.stop_loss)
 
             if current_high >= target_price:
-                self._close_position(position, index, target_price)
+                self._close_position(position, index, target_price, bar)
             elif current_low <= stop_loss_price:
-                self._close_position(position, index, stop_loss_price)
+                self._close_position(position, index, stop_loss_price, bar)
             elif index == len(self.data_handler.get_data()) - 1:
-                self._close_position(position, index, close_price)
+                self._close_position(position, index, close_price, bar)
 
-    def _close_position(self, position: Position, exit_index: int, exit_price: float):
-        profit = self.position_manager.close_position(position, exit_price)
+    def _close_position(
+        self, position: Position, exit_index: int, exit_price: float, bar: int = -1
+    ):
+        profit = self.position_manager.close_position(position, exit_price, bar)
         self.portfolio.add_realized_pnl(profit)
         self.portfolio.update_cash(profit)
         print(
             f"Position closed at index {exit_index} with price {exit_price}, Profit: {profit}"
         )
 
-    def _track_pnl(self, index: int):
+    def _track_pnl(self, bar: int):
         # Track Realized PnL
         realized_pnl = self.portfolio.get_realized_pnls()
 
@@ -188,16 +379,16 @@ class Backtester:
         cumulative_pnl = total_value - self.portfolio.get_cash() - realized_pnl
 
         # Store values
-        self.pnl_evolution.loc[index] = {  # type: ignore
-            "realized_pnl": realized_pnl,
-            "cumulative_pnl": cumulative_pnl,
-        }
+        self.equity.record(bar, realized_pnl, cumulative_pnl)
 
     def _results(self) -> dict:
+        ledger = self.position_manager.ledger
         return {
             "final_cash": self.portfolio.get_cash(),
             "total_value": self.portfolio.get_total_value(),
-            "total_trades": len(self.position_manager.get_open_positions()),
+            "total_trades": len(ledger),
+            "closed_trades": ledger.n_closed,
+            "open_trades": len(self.position_manager.get_open_positions()),
         }
 
     def plot_pnl_evolution(self):
@@ -223,15 +414,15 @@ class Backtester:
             )
         )
 
+        index = self.data_handler.index
+        ledger = self.position_manager.ledger
+
         # Add Buy markers (where positions are opened)
-        buy_indices = [
-            position.entry_index
-            for position in self.position_manager.get_open_positions()
-        ]
-        buy_prices = [self.data_handler.get_open(index) for index in buy_indices]
+        buy_indices = ledger.get_column("entry_index")
+        buy_prices = ledger.get_column("entry_price")
         fig.add_trace(
             go.Scatter(
-                x=self.data_handler.get_data().iloc[buy_indices].index,
+                x=index[buy_indices],
                 y=buy_prices,
                 mode="markers",
                 marker=dict(symbol="triangle-up", color="green", size=10),
@@ -240,14 +431,12 @@ class Backtester:
         )
 
         # Add Sell markers (where positions are closed)
-        sell_indices = [
-            position.entry_index
-            for position in self.position_manager.get_open_positions()
-        ]
-        sell_prices = [self.data_handler.get_open(index) for index in sell_indices]
+        closed = ledger.get_column("exit_index") >= 0
+        sell_indices = ledger.get_column("exit_index")[closed]
+        sell_prices = ledger.get_column("exit_price")[closed]
         fig.add_trace(
             go.Scatter(
-                x=self.data_handler.get_data().iloc[sell_indices].index,
+                x=index[sell_indices],
                 y=sell_prices,
                 mode="markers",
                 marker=dict(symbol="triangle-down", color="red", size=10),
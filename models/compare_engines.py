@@ -0,0 +1,91 @@
+import contextlib
+import io
+import click
+import numpy as np
+import pandas as pd
+from loguru import logger
+from models.backtester import Backtester
+
+
+def synthetic_market(bars: int = 2000, seed: int = 0) -> tuple:
+    """
+    Random-walk OHLC bars and a sparse entry signal on a RangeIndex.
+
+    Returns:
+        tuple: (data, signal) as expected by ``Backtester``.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.01, bars)) * close
+    data = pd.DataFrame(
+        {
+            "open": open_,
+            "high": np.maximum(open_, close) + spread,
+            "low": np.minimum(open_, close) - spread,
+            "close": close,
+        }
+    )
+    signal = pd.Series((rng.random(bars) < 0.1).astype(int))
+    return data, signal
+
+
+def compare_engines(data: pd.DataFrame, signal: pd.Series, **params) -> list:
+    """
+    Run the loop and array engines on the same inputs and list their differences.
+
+    Compares the results dict, ``pnl_evolution`` and ``trades``. The loop
+    engine's per-bar prints are discarded.
+
+    Returns:
+        list: One message per mismatch, empty when the engines agree.
+    """
+    runs = {}
+    for engine in Backtester.ENGINES:
+        backtester = Backtester(data, signal, engine=engine, **params)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = backtester.backtest()
+        runs[engine] = (results, backtester.pnl_evolution, backtester.trades)
+
+    (loop_results, loop_pnl, loop_trades), (array_results, array_pnl, array_trades) = (
+        runs["loop"],
+        runs["array"],
+    )
+    mismatches = []
+    if loop_results != array_results:
+        mismatches.append(f"results: loop {loop_results} != array {array_results}")
+    for name, loop_df, array_df in (
+        ("pnl_evolution", loop_pnl, array_pnl),
+        ("trades", loop_trades, array_trades),
+    ):
+        try:
+            pd.testing.assert_frame_equal(loop_df, array_df)
+        except AssertionError as e:
+            mismatches.append(f"{name}: {e}")
+    return mismatches
+
+
+@click.command()
+@click.option("--bars", default=2000, help="Number of bars per run.")
+@click.option("--seeds", default=5, help="Number of random markets to compare.")
+def main(bars: int, seeds: int):
+    """Check that the loop and array backtest engines produce identical results."""
+    failed = 0
+    for seed in range(seeds):
+        data, signal = synthetic_market(bars, seed)
+        for params in (
+            {},
+            {"max_positions": 1, "profit_target": 0.01, "stop_loss": 0.01},
+            {"initial_capital": 250, "fee": 0.0},
+        ):
+            mismatches = compare_engines(data, signal, **params)
+            if mismatches:
+                failed += 1
+                logger.error(f"seed {seed} {params}:\n" + "\n".join(mismatches))
+    if failed:
+        raise SystemExit(f"{failed} runs differ between engines")
+    logger.info(f"Loop and array engines agree on {seeds * 3} runs")
+
+
+if __name__ == "__main__":
+    main()
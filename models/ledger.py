@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+
+# 1. TradeLedger class recording every fill in preallocated columns
+class TradeLedger:
+    """
+    Columnar record of every trade, one row per opened position.
+
+    Rows are written in place into preallocated NumPy columns (capacity doubles
+    when full). Open trades have an ``exit_index`` of -1. Indices are bar
+    numbers, ``to_frame`` maps them back to labels.
+    """
+
+    COLUMNS = {
+        "asset": "int64",
+        "entry_index": "int64",
+        "exit_index": "int64",
+        "size": "int64",
+        "entry_price": "float64",
+        "exit_price": "float64",
+        "entry_fee": "float64",
+        "exit_fee": "float64",
+        "pnl": "float64",
+    }
+
+    __slots__ = ("columns", "n_trades", "n_closed")
+
+    def __init__(self, capacity: int = 256):
+        self.columns = {
+            name: np.empty(max(capacity, 1), dtype=dtype)
+            for name, dtype in self.COLUMNS.items()
+        }
+        self.n_trades = 0
+        self.n_closed = 0
+
+    def __len__(self) -> int:
+        return self.n_trades
+
+    def _grow(self, required: int = 0):
+        for name, column in self.columns.items():
+            grown = np.empty(max(len(column) * 2, required), dtype=column.dtype)
+            grown[: self.n_trades] = column[: self.n_trades]
+            self.columns[name] = grown
+
+    def open_trade(
+        self,
+        entry_index: int,
+        entry_price: float,
+        size: int,
+        fee: float,
+        asset: int = 0,
+    ) -> int:
+        """Record an entry fill and return its trade id (row number)."""
+        if self.n_trades == len(self.columns["entry_index"]):
+            self._grow()
+        trade_id = self.n_trades
+        columns = self.columns
+        columns["asset"][trade_id] = asset
+        columns["entry_index"][trade_id] = entry_index
+        columns["exit_index"][trade_id] = -1
+        columns["size"][trade_id] = size
+        columns["entry_price"][trade_id] = entry_price
+        columns["exit_price"][trade_id] = np.nan
+        columns["entry_fee"][trade_id] = fee
+        columns["exit_fee"][trade_id] = np.nan
+        columns["pnl"][trade_id] = np.nan
+        self.n_trades += 1
+        return trade_id
+
+    def close_trade(
+        self, trade_id: int, exit_index: int, exit_price: float, fee: float, pnl: float
+    ):
+        """Record the exit fill of an open trade."""
+        columns = self.columns
+        columns["exit_index"][trade_id] = exit_index
+        columns["exit_price"][trade_id] = exit_price
+        columns["exit_fee"][trade_id] = fee
+        columns["pnl"][trade_id] = pnl
+        self.n_closed += 1
+
+    def open_trades(
+        self,
+        entry_index: int,
+        entry_price: np.ndarray,
+        size: np.ndarray,
+        fee: np.ndarray,
+        asset: np.ndarray,
+    ) -> np.ndarray:
+        """Record a batch of entry fills on one bar and return their trade ids."""
+        count = len(entry_price)
+        start, stop = self.n_trades, self.n_trades + count
+        if stop > len(self.columns["entry_index"]):
+            self._grow(stop)
+        columns = self.columns
+        columns["asset"][start:stop] = asset
+        columns["entry_index"][start:stop] = entry_index
+        columns["exit_index"][start:stop] = -1
+        columns["size"][start:stop] = size
+        columns["entry_price"][start:stop] = entry_price
+        columns["exit_price"][start:stop] = np.nan
+        columns["entry_fee"][start:stop] = fee
+        columns["exit_fee"][start:stop] = np.nan
+        columns["pnl"][start:stop] = np.nan
+        self.n_trades = stop
+        return np.arange(start, stop)
+
+    def close_trades(
+        self,
+        trade_ids: np.ndarray,
+        exit_index: int,
+        exit_price: np.ndarray,
+        fee: np.ndarray,
+        pnl: np.ndarray,
+    ):
+        """Record a batch of exit fills on one bar."""
+        columns = self.columns
+        columns["exit_index"][trade_ids] = exit_index
+        columns["exit_price"][trade_ids] = exit_price
+        columns["exit_fee"][trade_ids] = fee
+        columns["pnl"][trade_ids] = pnl
+        self.n_closed += len(trade_ids)
+
+    def get_column(self, name: str) -> np.ndarray:
+        """View of the filled part of a column."""
+        return self.columns[name][: self.n_trades]
+
+    def to_frame(
+        self, index: Optional[pd.Index] = None, assets: Optional[pd.Index] = None
+    ) -> pd.DataFrame:
+        """
+        Materialize the ledger as a DataFrame.
+
+        Args:
+            index (pd.Index, None): Bar labels, adds entry_date/exit_date columns.
+            assets (pd.Index, None): Asset names, replaces asset codes.
+
+        Returns:
+            pd.DataFrame: One row per trade, indexed by trade id.
+        """
+        df = pd.DataFrame(
+            {name: self.get_column(name).copy() for name in self.COLUMNS}
+        ).rename_axis("trade_id")
+        if index is not None:
+            entry = df["entry_index"].to_numpy()
+            exit_ = df["exit_index"].to_numpy()
+            df["entry_date"] = index[entry]
+            exit_dates = pd.Series(index[np.maximum(exit_, 0)]).where(exit_ >= 0)
+            df["exit_date"] = exit_dates.to_numpy()
+        if assets is not None:
+            df["asset"] = assets[df["asset"].to_numpy()]
+        return df
+
+
+# 2. EquityCurve class holding the preallocated per-bar PnL evolution
+class EquityCurve:
+    __slots__ = ("realized_pnl", "cumulative_pnl", "n_bars")
+
+    def __init__(self, n_bars: int):
+        self.realized_pnl = np.full(n_bars, np.nan, dtype="float64")
+        self.cumulative_pnl = np.full(n_bars, np.nan, dtype="float64")
+        self.n_bars = 0
+
+    def record(self, bar: int, realized_pnl: float, cumulative_pnl: float):
+        self.realized_pnl[bar] = realized_pnl
+        self.cumulative_pnl[bar] = cumulative_pnl
+        self.n_bars = bar + 1
+
+    def to_frame(self, index: pd.Index) -> pd.DataFrame:
+        """Materialize the recorded bars as a DataFrame indexed by date."""
+        n = self.n_bars
+        return pd.DataFrame(
+            {
+                "realized_pnl": self.realized_pnl[:n],
+                "cumulative_pnl": self.cumulative_pnl[:n],
+            },
+            index=index[:n].rename("date"),
+        )
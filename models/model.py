@@ -1,14 +1,54 @@
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.base import clone
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import r2_score, mean_squared_error, classification_report
+from sklearn.metrics import (
+    accuracy_score,
+    classification_report,
+    mean_squared_error,
+    precision_score,
+    r2_score,
+)
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, Optional
+from models.backtester import Backtester
 from models.model_data import MomentumModelData
 
 
+def _run_fold(
+    fold: int,
+    pipeline: Pipeline,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_test: pd.DataFrame,
+    y_test: pd.Series,
+    ohlc: pd.DataFrame,
+    backtest_kwargs: Dict,
+) -> Dict:
+    """Fit on the train window, predict the test window and backtest the predictions."""
+    pipeline.fit(X_train, y_train)
+    predictions = pd.Series(pipeline.predict(X_test), index=X_test.index)
+
+    backtester = Backtester(ohlc, predictions, **backtest_kwargs)
+    results = backtester.backtest()
+
+    return {
+        "fold": fold,
+        "train_start": X_train.index[0],
+        "train_end": X_train.index[-1],
+        "test_start": X_test.index[0],
+        "test_end": X_test.index[-1],
+        "accuracy": accuracy_score(y_test, predictions),
+        "precision": precision_score(y_test, predictions, zero_division=0),
+        "signals": int(predictions.sum()),
+        **results,
+        "realized_pnl": backtester.portfolio.get_realized_pnls(),
+    }
+
+
 class MomentumModel:
     def __init__(self, n_steps: int = 12, threshold: float = 0.01):
         self.data = MomentumModelData(n_steps=n_steps, threshold=threshold)
@@ -59,3 +99,49 @@ class MomentumModel:
             )
 
         return metrics
+
+    def walk_forward(
+        self,
+        start_date: str,
+        end_date: str | None = None,
+        processes: Optional[int] = None,
+        **backtest_kwargs,
+    ) -> pd.DataFrame:
+        """
+        Walk-forward evaluation: per fold fit on train, predict and backtest test.
+
+        Features, targets and OHLC bars are loaded once for the whole range and
+        sliced per fold; folds run concurrently in a process pool.
+
+        Args:
+            start_date (str): Start of the full range.
+            end_date (str, None): End of the full range.
+            processes (int, None): Pool size, defaults to the number of folds.
+            **backtest_kwargs: Passed to Backtester, engine defaults to "array".
+
+        Returns:
+            pd.DataFrame: One row per fold with classification and backtest results.
+        """
+        X, y = self.data.prepare_data(start_date, end_date)
+        ohlc = self.data.get_ohlc_data(start_date, end_date)
+        backtest_kwargs.setdefault("engine", "array")
+
+        folds = list(self.tscv.split(X))
+        with ProcessPoolExecutor(max_workers=processes or len(folds)) as pool:
+            futures = [
+                pool.submit(
+                    _run_fold,
+                    fold,
+                    clone(self.pipeline),
+                    X.iloc[train_idx],
+                    y.iloc[train_idx],
+                    X.iloc[test_idx],
+                    y.iloc[test_idx],
+                    ohlc.loc[X.index[test_idx[0]] : X.index[test_idx[-1]]],
+                    backtest_kwargs,
+                )
+                for fold, (train_idx, test_idx) in enumerate(folds)
+            ]
+            rows = [future.result() for future in futures]
+
+        return pd.DataFrame(rows).set_index("fold")
@@ -1,34 +1,119 @@
+from collections import OrderedDict
 from data_hooks.tiingo import Tiingo
-from utils.py_utils import collapse_multi_index_cols, index_slice
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import Optional, Tuple
+
+
+class MomentumDataset:
+    """
+    Bars for one (range, ticker), loaded once, with X and y derived from them.
+
+    The close series is sliced a single time and the feature matrix, target
+    and OHLC frame are computed lazily and kept, so every model call on the
+    same range shares one load.
+    """
+
+    def __init__(
+        self,
+        data: "MomentumModelData",
+        start_date: str,
+        end_date: str | None = None,
+        ticker: str = "btcusd",
+    ):
+        self.data = data
+        self.start_date = start_date
+        self.end_date = end_date
+        self.ticker = ticker
+        self._ohlc: Optional[pd.DataFrame] = None
+        self._X: Optional[pd.DataFrame] = None
+        self._y: Optional[pd.Series] = None
+
+    @property
+    def ohlc(self) -> pd.DataFrame:
+        """Field columns of the ticker, read from the hook once."""
+        if self._ohlc is None:
+            df = Tiingo().get_data(
+                start_date=self.start_date, end_date=self.end_date, cache=True
+            )
+            self._ohlc = df.xs(self.ticker, level="ticker", axis=1)
+        return self._ohlc
+
+    @property
+    def close(self) -> pd.Series:
+        return self.ohlc["close"]
+
+    @property
+    def X(self) -> pd.DataFrame:
+        if self._X is None:
+            self._X = self.data.build_x(self.close)
+        return self._X
+
+    @property
+    def y(self) -> pd.Series:
+        if self._y is None:
+            self._y = self.data.build_y(self.close)
+        return self._y
+
+    def xy(self) -> Tuple[pd.DataFrame, pd.Series]:
+        """X and y aligned on their common index."""
+        aligned_idx = self.X.index.intersection(self.y.index)
+        return self.X.loc[aligned_idx], self.y.loc[aligned_idx]
 
 
 class MomentumModelData:
-    def __init__(self, n_steps: int = 12, threshold: float = 0.01):
+    def __init__(
+        self,
+        n_steps: int = 12,
+        threshold: float = 0.01,
+        ticker: str = "btcusd",
+        max_sessions: int = 4,
+    ):
         self.n_steps = n_steps
         self.threshold = threshold
+        self.ticker = ticker
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[tuple, MomentumDataset]" = OrderedDict()
+
+    def session(self, start_date: str, end_date: str | None = None) -> MomentumDataset:
+        """Get the dataset session for a range, reusing the most recent ones."""
+        key = (start_date, end_date, self.ticker)
+        if key in self._sessions:
+            self._sessions.move_to_end(key)
+        else:
+            self._sessions[key] = MomentumDataset(
+                self, start_date, end_date, self.ticker
+            )
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return self._sessions[key]
+
+    def clear_sessions(self):
+        """Forget loaded sessions, e.g. to pick up new bars of an open range."""
+        self._sessions.clear()
 
     def prepare_data(
         self, start_date: str, end_date: str | None = None
     ) -> Tuple[pd.DataFrame, pd.Series]:
         """Prepare X and y data for modeling."""
-        X = self.get_x_data(start_date, end_date)
-        y = self.get_y_data(start_date, end_date)
-
-        # Align indices
-        aligned_idx = X.index.intersection(y.index)
-        return X.loc[aligned_idx], y.loc[aligned_idx]
+        return self.session(start_date, end_date).xy()
 
     def get_x_data(self, start_date: str, end_date: str | None = None) -> pd.DataFrame:
         """Generate feature matrix X."""
-        df = Tiingo().get_data(start_date=start_date, end_date=end_date, cache=True)
-        close = collapse_multi_index_cols(
-            index_slice(df, field="close", ticker="btcusd")
-        )
-        close = close.squeeze()  # Convert DataFrame to Series
+        return self.session(start_date, end_date).X
+
+    def get_y_data(self, start_date: str, end_date: str | None = None) -> pd.Series:
+        """Generate target variable."""
+        return self.session(start_date, end_date).y
 
+    def get_ohlc_data(
+        self, start_date: str, end_date: str | None = None
+    ) -> pd.DataFrame:
+        """Get the OHLC frame used to backtest predictions."""
+        return self.session(start_date, end_date).ohlc
+
+    def build_x(self, close: pd.Series) -> pd.DataFrame:
+        """Feature matrix X from a close series."""
         X = pd.DataFrame(index=close.index)
 
         # Technical features
@@ -43,14 +128,8 @@ class MomentumModelData:
 
         return X.dropna()
 
-    def get_y_data(self, start_date: str, end_date: str | None = None) -> pd.Series:
-        """Generate target variable."""
-        df = Tiingo().get_data(start_date=start_date, end_date=end_date, cache=True)
-        close = collapse_multi_index_cols(
-            index_slice(df, field="close", ticker="btcusd")
-        )
-        close = close.squeeze()  # Convert DataFrame to Series
-
+    def build_y(self, close: pd.Series) -> pd.Series:
+        """Target variable from a close series."""
         future_returns = close.shift(-self.n_steps).div(close) - 1
         y = pd.Series(0, index=close.index)
         y.loc[future_returns > self.threshold] = 1  # Use .loc for boolean indexing
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from typing import List, Optional
+from models.ledger import EquityCurve, TradeLedger
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+
+# 1. PortfolioData class holding (field, bar, ticker) price cubes
+class PortfolioData:
+    def __init__(
+        self,
+        data: DataFrame,
+        signal: DataFrame,
+        tickers: Optional[List[str]] = None,
+    ):
+        """
+        Align a (ticker, field) pivot with a signal matrix and extract arrays.
+
+        Args:
+            data (DataFrame): Pivot from Tiingo.get_data with (ticker, field) columns.
+            signal (DataFrame): One column per ticker, 1 opens a position.
+            tickers (list, None): Tickers to trade, defaults to those in both inputs.
+        """
+        data_tickers = data.columns.get_level_values("ticker").unique()
+        if tickers is None:
+            tickers = [t for t in signal.columns if t in data_tickers]
+        if not tickers:
+            raise ValueError("No tickers shared between data and signal")
+
+        index = data.index.intersection(signal.index)
+        self.index = index
+        self.tickers = pd.Index(tickers, name="ticker")
+        self.prices = np.empty(
+            (len(PRICE_FIELDS), len(index), len(tickers)), dtype="float64"
+        )
+        for row, field in enumerate(PRICE_FIELDS):
+            field_df = data.xs(field, level="field", axis=1)
+            self.prices[row] = field_df.reindex(index=index, columns=tickers).to_numpy(
+                dtype="float64"
+            )
+        self.entries = (
+            signal.reindex(index=index, columns=tickers).to_numpy() == 1
+        ) & ~np.isnan(self.prices[0])
+
+
+# 2. PortfolioBacktester class running all tickers per bar in one batched step
+class PortfolioBacktester:
+    """
+    Backtest many tickers against one shared cash balance.
+
+    Open positions live in (ticker, slot) matrices so that every bar is one
+    vectorized step across the ticker axis: exits are checked for all open
+    positions, then signalled tickers are filled in ticker order for as long as
+    the shared cash covers their open price. Closing a position credits the
+    exit proceeds net of fees back to cash, and anything still open on the last
+    bar is closed at the close price.
+
+    ``max_positions_per_ticker`` caps the open positions of each ticker, not
+    of the portfolio: up to ``max_positions_per_ticker * len(tickers)``
+    positions can be open at once, bounded only by cash.
+    """
+
+    def __init__(
+        self,
+        data: DataFrame,
+        signal: DataFrame,
+        initial_capital=100,
+        max_positions_per_ticker=5,
+        profit_target=0.05,
+        stop_loss=0.02,
+        fee=0.0015,
+        tickers: Optional[List[str]] = None,
+    ):
+        self.data = PortfolioData(data, signal, tickers)
+        self.initial_capital = initial_capital
+        self.max_positions_per_ticker = max_positions_per_ticker
+        self.profit_target = profit_target
+        self.stop_loss = stop_loss
+        self.fee = fee
+        self.cash = float(initial_capital)
+        self.total_value = float(initial_capital)
+        self.ledger = TradeLedger()
+        self.equity = EquityCurve(len(self.data.index))
+        n_tickers = len(self.data.tickers)
+        self.entry_prices = np.full((n_tickers, max_positions_per_ticker), np.nan)
+        self.trade_ids = np.full(
+            (n_tickers, max_positions_per_ticker), -1, dtype="int64"
+        )
+
+    @property
+    def pnl_evolution(self) -> DataFrame:
+        return self.equity.to_frame(self.data.index)
+
+    @property
+    def trades(self) -> DataFrame:
+        """Every fill recorded during the backtest, one row per trade."""
+        return self.ledger.to_frame(self.data.index, assets=self.data.tickers)
+
+    def backtest(self) -> dict:
+        opens, highs, lows, closes = self.data.prices
+        entries = self.data.entries
+        last_bar = len(self.data.index) - 1
+        realized = 0.0
+
+        for bar in range(len(self.data.index)):
+            self._open_positions(bar, opens[bar], entries[bar])
+            realized += self._check_positions(
+                bar, highs[bar], lows[bar], closes[bar], bar == last_bar
+            )
+
+            is_open = ~np.isnan(self.entry_prices)
+            marks = np.where(is_open, closes[bar][:, None], 0.0)
+            unrealized = np.nansum(marks - np.where(is_open, self.entry_prices, 0.0))
+            self.total_value = self.cash + float(np.nansum(marks))
+            self.equity.record(bar, realized, realized + float(unrealized))
+
+        return self._results()
+
+    def _open_positions(self, bar: int, opens: np.ndarray, entries: np.ndarray):
+        is_free = np.isnan(self.entry_prices)
+        candidates = np.flatnonzero(entries & is_free.any(axis=1))
+        if len(candidates) == 0:
+            return
+
+        # Fill in ticker order while the shared cash covers the cumulative cost
+        costs = opens[candidates]
+        affordable = np.cumsum(costs) <= self.cash
+        tickers, costs = candidates[affordable], costs[affordable]
+        if len(tickers) == 0:
+            return
+
+        slots = is_free[tickers].argmax(axis=1)
+        fees = costs * self.fee
+        trade_ids = self.ledger.open_trades(
+            bar, costs, np.ones(len(tickers), dtype="int64"), fees, tickers
+        )
+        self.entry_prices[tickers, slots] = costs
+        self.trade_ids[tickers, slots] = trade_ids
+        self.cash -= float(costs.sum())
+
+    def _check_positions(
+        self,
+        bar: int,
+        highs: np.ndarray,
+        lows: np.ndarray,
+        closes: np.ndarray,
+        is_last: bool,
+    ) -> float:
+        entry = self.entry_prices
+        target_prices = entry * (1 + self.profit_target)
+        stop_loss_prices = entry * (1 - self.stop_loss)
+
+        hit_target = highs[:, None] >= target_prices
+        hit_stop = ~hit_target & (lows[:, None] <= stop_loss_prices)
+        exit_prices = np.where(hit_target, target_prices, stop_loss_prices)
+        closing = hit_target | hit_stop
+        if is_last:
+            still_open = ~closing & ~np.isnan(entry) & ~np.isnan(closes)[:, None]
+            exit_prices = np.where(still_open, closes[:, None], exit_prices)
+            closing |= still_open
+        if not closing.any():
+            return 0.0
+
+        exit_prices = exit_prices[closing]
+        entry_prices = entry[closing]
+        fees = exit_prices * self.fee
+        profits = exit_prices - fees - entry_prices
+        self.ledger.close_trades(
+            self.trade_ids[closing], bar, exit_prices, fees, profits
+        )
+        self.cash += float((entry_prices + profits).sum())
+        self.entry_prices[closing] = np.nan
+        self.trade_ids[closing] = -1
+        return float(profits.sum())
+
+    def _results(self) -> dict:
+        return {
+            "final_cash": self.cash,
+            "total_value": self.total_value,
+            "total_trades": len(self.ledger),
+            "closed_trades": self.ledger.n_closed,
+            "open_trades": int((~np.isnan(self.entry_prices)).sum()),
+        }
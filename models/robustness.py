@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence, Union
+from models.ledger import TradeLedger
+
+
+def bootstrap_indices(
+    rng: np.random.Generator, n_sims: int, length: int, block_size: int = 1
+) -> np.ndarray:
+    """
+    Draw resampling indices of shape (n_sims, length).
+
+    With ``block_size`` > 1 this is a circular block bootstrap: contiguous runs
+    of ``block_size`` observations are kept together to preserve autocorrelation.
+    """
+    if block_size <= 1:
+        return rng.integers(0, length, size=(n_sims, length))
+    n_blocks = -(-length // block_size)
+    starts = rng.integers(0, length, size=(n_sims, n_blocks, 1))
+    indices = (starts + np.arange(block_size)) % length
+    return indices.reshape(n_sims, n_blocks * block_size)[:, :length]
+
+
+def _path_stats(
+    samples: np.ndarray, compound: bool, periods_per_year: Optional[float]
+) -> dict:
+    """Final PnL, max drawdown and Sharpe for each row of a (sims, time) array."""
+    if compound:
+        equity = np.cumprod(1 + samples, axis=1)
+        final = equity[:, -1] - 1
+        peaks = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+        drawdown = ((peaks - equity) / peaks).max(axis=1)
+    else:
+        equity = np.cumsum(samples, axis=1)
+        final = equity[:, -1]
+        peaks = np.maximum(np.maximum.accumulate(equity, axis=1), 0.0)
+        drawdown = (peaks - equity).max(axis=1)
+
+    std = samples.std(axis=1, ddof=1)
+    sharpe = np.divide(
+        samples.mean(axis=1), std, out=np.full(len(samples), np.nan), where=std > 0
+    )
+    if periods_per_year:
+        sharpe *= np.sqrt(periods_per_year)
+    return {"final_pnl": final, "max_drawdown": drawdown, "sharpe": sharpe}
+
+
+def bootstrap(
+    values: Union[Sequence[float], np.ndarray, pd.Series],
+    n_sims: int = 10_000,
+    block_size: int = 1,
+    chunk_size: int = 1_000,
+    compound: bool = False,
+    periods_per_year: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Resample a PnL or return sequence and measure every simulated path.
+
+    Each chunk of simulations is one (chunk_size, length) array computation, so
+    peak memory is bounded by ``chunk_size`` rather than ``n_sims``.
+
+    Args:
+        values: Trade PnLs (additive) or periodic returns (with compound=True).
+        n_sims (int): Number of simulated paths.
+        block_size (int): Block length for the block bootstrap, 1 for i.i.d.
+        chunk_size (int): Simulations evaluated per array pass.
+        compound (bool): Treat values as returns and compound them.
+        periods_per_year (float, None): Annualizes the Sharpe ratio when given.
+        seed (int, None): Seed for reproducible draws.
+
+    Returns:
+        pd.DataFrame: One row per simulation with final_pnl, max_drawdown and sharpe.
+    """
+    values = np.asarray(values, dtype="float64")
+    values = values[~np.isnan(values)]
+    if len(values) < 2:
+        raise ValueError("Need at least two observations to bootstrap")
+
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for start in range(0, n_sims, chunk_size):
+        size = min(chunk_size, n_sims - start)
+        samples = values[bootstrap_indices(rng, size, len(values), block_size)]
+        chunks.append(pd.DataFrame(_path_stats(samples, compound, periods_per_year)))
+
+    return pd.concat(chunks, ignore_index=True).rename_axis("simulation")
+
+
+def bootstrap_trades(
+    trades: Union[TradeLedger, pd.DataFrame], **kwargs
+) -> pd.DataFrame:
+    """Bootstrap the closed trade PnLs of a backtest ledger (see ``bootstrap``)."""
+    if isinstance(trades, TradeLedger):
+        pnl = trades.get_column("pnl")
+    else:
+        pnl = trades["pnl"].to_numpy(dtype="float64")
+    return bootstrap(pnl, **kwargs)
+
+
+def summarize(
+    simulations: pd.DataFrame, quantiles: Sequence[float] = (0.05, 0.5, 0.95)
+) -> pd.DataFrame:
+    """Quantiles of each simulated statistic plus the share of losing paths."""
+    summary = simulations.quantile(list(quantiles))
+    summary.loc["prob_loss", "final_pnl"] = (simulations["final_pnl"] < 0).mean()
+    return summary
@@ -0,0 +1,228 @@
+from dataclasses import dataclass
+from datetime import datetime
+import time
+import numpy as np
+import pandas as pd
+from loguru import logger
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+from models.backtester import Portfolio, Position, PositionManager
+
+
+# 1. Bar and event types flowing through the engine
+@dataclass(slots=True)
+class Bar:
+    timestamp: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    signal: int = 0
+
+
+@dataclass(slots=True)
+class FillEvent:
+    timestamp: datetime
+    side: str  # "buy" or "sell"
+    price: float
+    size: int
+    fee: float
+    profit: float = 0.0
+
+
+@dataclass(slots=True)
+class PnLEvent:
+    timestamp: datetime
+    cash: float
+    realized_pnl: float
+    unrealized_pnl: float
+    open_positions: int
+
+
+Event = Union[FillEvent, PnLEvent]
+
+
+# 2. Bar sources, each yielding one Bar at a time
+def iter_dataframe_bars(data: pd.DataFrame, signal: pd.Series) -> Iterator[Bar]:
+    """Yield bars from an OHLC frame and a signal series aligned on the index."""
+    aligned_data, aligned_signal = data.align(signal, join="inner", axis=0)
+    rows = zip(
+        aligned_data.index,
+        aligned_data["open"].to_numpy(dtype="float64"),
+        aligned_data["high"].to_numpy(dtype="float64"),
+        aligned_data["low"].to_numpy(dtype="float64"),
+        aligned_data["close"].to_numpy(dtype="float64"),
+        aligned_signal.to_numpy(),
+    )
+    for timestamp, open_, high, low, close, sig in rows:
+        yield Bar(timestamp, open_, high, low, close, 1 if sig == 1 else 0)
+
+
+def iter_replay_file(
+    path: str, chunksize: int = 10_000, signal_col: str = "signal"
+) -> Iterator[Bar]:
+    """
+    Replay bars from a CSV file with datetime, open, high, low, close and signal
+    columns, reading it in chunks so memory does not grow with the file.
+    """
+    chunks = pd.read_csv(
+        path,
+        chunksize=chunksize,
+        parse_dates=["datetime"],
+        float_precision="round_trip",
+    )
+    for chunk in chunks:
+        signal = chunk[signal_col] if signal_col in chunk else 0
+        chunk = chunk.assign(signal=signal).set_index("datetime")
+        yield from iter_dataframe_bars(chunk, chunk["signal"])
+
+
+def poll_bars(
+    fetch_latest: Callable[[], Optional[Bar]],
+    interval: float = 300,
+    max_bars: Optional[int] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Iterator[Bar]:
+    """
+    Poll a live source and yield each new bar once.
+
+    Args:
+        fetch_latest (Callable): Returns the latest completed Bar, or None.
+        interval (float): Seconds between polls.
+        max_bars (int, None): Stop after this many bars, poll forever if None.
+    """
+    last_timestamp = None
+    emitted = 0
+    while max_bars is None or emitted < max_bars:
+        try:
+            bar = fetch_latest()
+        except Exception as e:
+            logger.warning(f"Failed to poll latest bar: {e}")
+            bar = None
+        if bar is not None and (
+            last_timestamp is None or bar.timestamp > last_timestamp
+        ):
+            last_timestamp = bar.timestamp
+            emitted += 1
+            yield bar
+            continue
+        sleep(interval)
+
+
+# 3. LatencyTracker class keeping a fixed window of per-bar timings
+class LatencyTracker:
+    def __init__(self, window: int = 10_000, budget_us: Optional[float] = None):
+        self.samples = np.zeros(window, dtype="float64")
+        self.count = 0
+        self.budget_us = budget_us
+        self.over_budget = 0
+
+    def record(self, elapsed_us: float):
+        self.samples[self.count % len(self.samples)] = elapsed_us
+        self.count += 1
+        if self.budget_us is not None and elapsed_us > self.budget_us:
+            self.over_budget += 1
+
+    def stats(self) -> dict:
+        """Latency percentiles in microseconds over the most recent window."""
+        window = self.samples[: min(self.count, len(self.samples))]
+        if len(window) == 0:
+            return {"bars": 0}
+        p50, p99 = np.percentile(window, [50, 99])
+        return {
+            "bars": self.count,
+            "p50_us": float(p50),
+            "p99_us": float(p99),
+            "max_us": float(window.max()),
+            "over_budget": self.over_budget,
+        }
+
+
+# 4. StreamingEngine class processing bars incrementally
+class StreamingEngine:
+    """
+    Event-driven counterpart of Backtester for replay and paper trading.
+
+    Uses the same PositionManager/Portfolio rules bar by bar, so replaying a
+    DataFrame gives the same cash and realized PnL as ``Backtester``. State is
+    only the open positions and running totals; no history is kept.
+    """
+
+    def __init__(
+        self,
+        initial_capital=100,
+        max_positions=5,
+        profit_target=0.05,
+        stop_loss=0.02,
+        fee=0.0015,
+        latency_budget_us: Optional[float] = None,
+        latency_window: int = 10_000,
+    ):
+        self.position_manager = PositionManager(
+            max_positions, fee, ledger_capacity=None
+        )
+        self.portfolio = Portfolio(initial_capital)
+        self.profit_target = profit_target
+        self.stop_loss = stop_loss
+        self.latency = LatencyTracker(latency_window, latency_budget_us)
+
+    def on_bar(self, bar: Bar) -> List[Event]:
+        """Process one bar and return the fills it produced followed by a PnL event."""
+        started = time.perf_counter_ns()
+        events: List[Event] = []
+        positions = self.position_manager
+
+        if (
+            bar.signal == 1
+            and len(positions.get_open_positions()) < positions.max_positions
+        ):
+            if self.portfolio.get_cash() >= bar.open:
+                position = positions.open_position(bar.timestamp, bar.open, 1)  # type: ignore
+                self.portfolio.update_cash(-bar.open)
+                events.append(
+                    FillEvent(bar.timestamp, "buy", bar.open, 1, position.fee)
+                )
+
+        # Iterate the live list exactly like Backtester._check_positions
+        for position in positions.get_open_positions():
+            target_price = position.entry_price * (1 + self.profit_target)
+            stop_loss_price = position.entry_price * (1 - self.stop_loss)
+            if bar.high >= target_price:
+                events.append(self._close_position(position, bar, target_price))
+            elif bar.low <= stop_loss_price:
+                events.append(self._close_position(position, bar, stop_loss_price))
+
+        unrealized = 0.0
+        for position in positions.get_open_positions():
+            unrealized += (bar.close - position.entry_price) * position.size
+        events.append(
+            PnLEvent(
+                bar.timestamp,
+                self.portfolio.get_cash(),
+                self.portfolio.get_realized_pnls(),
+                unrealized,
+                len(positions.get_open_positions()),
+            )
+        )
+
+        self.latency.record((time.perf_counter_ns() - started) / 1_000)
+        return events
+
+    def _close_position(
+        self, position: Position, bar: Bar, exit_price: float
+    ) -> FillEvent:
+        profit = self.position_manager.close_position(position, exit_price)
+        self.portfolio.add_realized_pnl(profit)
+        self.portfolio.update_cash(profit)
+        return FillEvent(
+            bar.timestamp,
+            "sell",
+            exit_price,
+            position.size,
+            exit_price * self.position_manager.fee,
+            profit,
+        )
+
+    def run(self, bars: Iterable[Bar]) -> Iterator[Event]:
+        """Consume bars lazily and yield events as they happen."""
+        for bar in bars:
+            yield from self.on_bar(bar)
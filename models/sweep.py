@@ -0,0 +1,138 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+import os
+import numpy as np
+import pandas as pd
+from loguru import logger
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.backtester import MARKET_ARRAY_ROWS, market_arrays, simulate_arrays
+
+SWEEP_PARAMS = ("profit_target", "stop_loss", "max_positions", "fee")
+DEFAULT_PARAMS = {
+    "profit_target": 0.05,
+    "stop_loss": 0.02,
+    "max_positions": 5,
+    "fee": 0.0015,
+}
+
+# Worker-side view of the shared market block, attached once per process
+_shm: Optional[shared_memory.SharedMemory] = None
+_market: Optional[np.ndarray] = None
+
+
+def _attach_market(name: str, shape: Tuple[int, int]):
+    global _shm, _market
+    _shm = shared_memory.SharedMemory(name=name)
+    _market = np.ndarray(shape, dtype="float64", buffer=_shm.buf)
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """Largest peak-to-trough decline of an equity curve, as a fraction of the peak."""
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    drawdowns = np.where(peaks > 0, (peaks - equity) / peaks, 0.0)
+    return float(drawdowns.max())
+
+
+def _run_combination(params: Dict, market: np.ndarray, initial_capital: float) -> Dict:
+    state = simulate_arrays(*market, initial_capital=initial_capital, **params)
+    equity = initial_capital + state["equity"].realized_pnl
+    return {
+        **params,
+        "final_cash": state["cash"],
+        "realized_pnl": state["realized_pnl"],
+        "trades": state["ledger"].n_closed,
+        "open_positions": len(state["positions"]),
+        "max_drawdown": max_drawdown(equity),
+    }
+
+
+def _run_worker(args: Tuple[Dict, float]) -> Dict:
+    params, initial_capital = args
+    return _run_combination(params, _market, initial_capital)  # type: ignore
+
+
+def expand_grid(param_grid: Dict[str, Sequence]) -> List[Dict]:
+    """Expand a {param: values} grid into one dict per combination."""
+    unknown = set(param_grid) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(
+            f"Unknown sweep parameters {sorted(unknown)}, expected {SWEEP_PARAMS}"
+        )
+    grid = {**{k: [v] for k, v in DEFAULT_PARAMS.items()}, **param_grid}
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in product(*grid.values())]
+
+
+def run_sweep(
+    data: pd.DataFrame,
+    signal: pd.Series,
+    param_grid: Dict[str, Sequence],
+    initial_capital: float = 100,
+    processes: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Backtest every combination of a parameter grid across a process pool.
+
+    The data is aligned once and the OHLC/signal arrays are placed in a single
+    shared memory block which every worker maps read-only, so bar data is not
+    pickled or copied per worker or per combination.
+
+    Args:
+        data (pd.DataFrame): OHLC frame with open/high/low/close columns.
+        signal (pd.Series): Entry signal, 1 opens a position.
+        param_grid (dict): Values to try for any of profit_target, stop_loss,
+            max_positions and fee. Missing parameters use Backtester defaults.
+        initial_capital (float): Starting cash for each run.
+        processes (int, None): Pool size, defaults to the number of CPUs.
+        chunksize (int, None): Combinations handed to a worker at a time.
+
+    Returns:
+        pd.DataFrame: One row per combination with final_cash, trades and
+            max_drawdown (of initial capital plus realized PnL).
+
+    Example:
+        run_sweep(df, signal, {"profit_target": [0.01, 0.02], "stop_loss": [0.01]})
+    """
+    combinations = expand_grid(param_grid)
+    aligned_data, aligned_signal = data.align(signal, join="inner", axis=0)
+    block = market_arrays(aligned_data, aligned_signal)
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1:
+        rows = [_run_combination(p, block, initial_capital) for p in combinations]
+        return pd.DataFrame(rows)
+
+    if chunksize is None:
+        chunksize = max(1, len(combinations) // (processes * 4))
+
+    shm = shared_memory.SharedMemory(create=True, size=block.nbytes)
+    try:
+        shared = np.ndarray(block.shape, dtype="float64", buffer=shm.buf)
+        shared[:] = block
+        del block
+        logger.info(
+            f"Sweeping {len(combinations)} combinations over {shared.shape[1]} bars "
+            f"({len(MARKET_ARRAY_ROWS)} arrays in shared memory) on {processes} processes"
+        )
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_attach_market,
+            initargs=(shm.name, shared.shape),
+        ) as pool:
+            rows = list(
+                pool.map(
+                    _run_worker,
+                    [(p, initial_capital) for p in combinations],
+                    chunksize=chunksize,
+                )
+            )
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return pd.DataFrame(rows)
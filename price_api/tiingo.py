@@ -11,6 +11,9 @@ class TiingoAPI(ApiABC):
             "Content-Type": "application/json",
             "Authorization": f"Token {self.key}",
         }
+        # Reuse connections across requests
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     def metadata(
         self,
@@ -45,7 +48,7 @@ class TiingoAPI(ApiABC):
             }
         else:
             params = None
-        response = requests.get(self.base_url, headers=self.headers, params=params)
+        response = self.session.get(self.base_url, params=params)
         if response.status_code == 200:
             return response.json()
         else:
@@ -89,11 +92,13 @@ class TiingoAPI(ApiABC):
             "resampleFreq": resample_freq,
             "exchangeData": exchangeData,
         }
-        response = requests.get(
-            self.base_url + "prices", headers=self.headers, params=params
-        )
+        response = self.session.get(self.base_url + "prices", params=params)
         if response.status_code == 200:
-            data_out = response.json()[0]
+            payload = response.json()
+            if not payload:
+                # No data for the tickers in this range
+                return pd.DataFrame() if return_as_df else {}
+            data_out = payload[0]
             if return_as_df:
                 ticker = data_out["ticker"]
                 data = data_out["priceData"]
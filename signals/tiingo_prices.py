@@ -1,4 +1,3 @@
-from functools import lru_cache
 from data_hooks.data_hook import Datahook
 from data_hooks.tiingo import Tiingo
 from utils.py_utils import keep_levels
@@ -7,15 +6,15 @@ import pandas as pd
 
 
 class TiingoPriceSignal(Datahook):
-    @lru_cache
+    @Datahook.cache_memory(ttl=300, per_instance=True)
     def get_data(self):
-        df = Tiingo().get_data(start_date="2024-01-01")
+        # Hourly OHLCV buckets are aggregated by the database
+        df = Tiingo().get_bars(start_date="2024-01-01", resolution="1h")
         df = keep_levels(df, levels_to_keep=["field"])
-        df = df.resample("h").last()
         self.df = df
         return df
 
-    @lru_cache
+    @Datahook.cache_memory(ttl=300, per_instance=True)
     def get_y_data(self, future_window=24, threshold=0.01, **kwargs):
         """
         Create the target variable: 1 if price increases by the threshold in the future_window, else 0.
@@ -28,7 +27,7 @@ class TiingoPriceSignal(Datahook):
         target = (future_returns > threshold).astype(int)
         return target
 
-    @lru_cache
+    @Datahook.cache_memory(ttl=300, per_instance=True)
     def get_x_data(self, window=12, **kwargs):
         """
         Create features for the model using momentum indicators and recent data.
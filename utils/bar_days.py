@@ -0,0 +1,51 @@
+"""Day partitioning of bars, and which days are complete enough to cache or store."""
+
+import os
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from loguru import logger
+
+# Recent days may still be partial while ingestion or a backfill catches up,
+# so only days at least this far behind today are treated as complete
+SETTLE_DAYS = int(os.getenv("BARS_SETTLE_DAYS", 1))
+
+
+def settled_before(settle_days: Optional[int] = None) -> pd.Timestamp:
+    """First day that is not known to be complete; every earlier day is."""
+    today = pd.Timestamp.now("UTC").tz_localize(None).normalize()
+    lag = SETTLE_DAYS if settle_days is None else settle_days
+    return today - pd.Timedelta(days=lag)
+
+
+def settled_days(start_date: str, end_date: Optional[str] = None) -> List[pd.Timestamp]:
+    """Complete days from ``start_date`` to ``end_date``, both inclusive."""
+    last = settled_before() - pd.Timedelta(days=1)
+    end = min(pd.Timestamp(end_date), last) if end_date else last
+    return list(pd.date_range(pd.Timestamp(start_date).normalize(), end.normalize()))
+
+
+def day_intervals(days: List[pd.Timestamp]) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Group days into [start, end) intervals of consecutive days."""
+    intervals: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
+    one_day = pd.Timedelta(days=1)
+    for day in sorted(days):
+        if intervals and intervals[-1][1] == day:
+            intervals[-1] = (intervals[-1][0], day + one_day)
+        else:
+            intervals.append((day, day + one_day))
+    logger.debug(f"{len(days)} days in {len(intervals)} intervals")
+    return intervals
+
+
+def split_by_day(
+    df: pd.DataFrame, days: List[pd.Timestamp]
+) -> Dict[pd.Timestamp, pd.DataFrame]:
+    """Split a datetime-indexed frame into one frame per day, empty days included."""
+    empty = df.iloc[0:0]
+    segments = {day: empty for day in days}
+    if df.empty:
+        return segments
+    for day, day_df in df.groupby(df.index.normalize()):
+        if day in segments:
+            segments[day] = day_df  # type: ignore
+    return segments
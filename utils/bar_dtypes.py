@@ -0,0 +1,155 @@
+"""Compact dtypes and pivots of long-format bars (datetime, ticker, field, value, source)."""
+
+from typing import Iterable, Iterator, List
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+
+# Column order of the bars table and its unique key
+BARS_COLUMNS = ["datetime", "ticker", "field", "value", "source"]
+BARS_KEY = ["datetime", "ticker", "field", "source"]
+
+# Low-cardinality text columns, repeated on every row
+BAR_CATEGORIES = ["ticker", "field", "source"]
+
+# Arrow types for the long-format bars table, text columns dictionary-encoded
+BARS_COLUMN_TYPES = {
+    "datetime": pa.timestamp("ns"),
+    "ticker": pa.dictionary(pa.int32(), pa.string()),
+    "field": pa.dictionary(pa.int32(), pa.string()),
+    "value": pa.float64(),
+    "source": pa.dictionary(pa.int32(), pa.string()),
+}
+
+
+def datetime_to_ns(values) -> np.ndarray:
+    """Convert timestamps to int64 nanoseconds since the epoch, naive UTC."""
+    index = pd.DatetimeIndex(pd.to_datetime(values))
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.as_unit("ns").asi8
+
+
+def ns_to_datetime(values: np.ndarray) -> pd.DatetimeIndex:
+    """Convert int64 nanoseconds since the epoch back to timestamps."""
+    return pd.DatetimeIndex(np.asarray(values, dtype="int64").view("datetime64[ns]"))
+
+
+def compact_bars(df: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """
+    Convert long-format bars to compact dtypes.
+
+    Text columns become categoricals, timestamps datetime64[ns] (an int64 ns
+    buffer) and values float64, or float32 to halve them again. Values that
+    are already float32 stay float32.
+
+    Args:
+        df (pd.DataFrame): Long-format bars, any subset of the columns.
+        float32 (bool): Store values as float32.
+
+    Returns:
+        pd.DataFrame: The same rows with compact column dtypes.
+    """
+    df = df.copy(deep=False)
+    for column in BAR_CATEGORIES:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    if "datetime" in df:
+        df["datetime"] = ns_to_datetime(datetime_to_ns(df["datetime"]))
+    if "value" in df:
+        keep_float32 = float32 or df["value"].dtype == np.float32
+        df["value"] = df["value"].astype("float32" if keep_float32 else "float64")
+    return df
+
+
+def concat_bars(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate long-format bars without falling back to object columns.
+
+    ``pd.concat`` turns categoricals with different categories into object
+    columns, so categories are unioned first.
+    """
+    frames = list(frames)
+    non_empty = [compact_bars(frame) for frame in frames if not frame.empty]
+    if not non_empty:
+        return frames[0] if frames else pd.DataFrame()
+    frames = non_empty
+    for column in BAR_CATEGORIES:
+        if column in frames[0]:
+            categories = union_categoricals(
+                [frame[column] for frame in frames]
+            ).categories
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def pivot_bars(raw_df: pd.DataFrame) -> pd.DataFrame:
+    """Pivot long-format bars to (ticker, field) columns indexed by datetime."""
+    # Bars are unique per key since ingestion upserts, no pandas dedupe
+    df = compact_bars(raw_df[["datetime", "ticker", "field", "value"]])
+    pivot = pd.pivot_table(
+        df,
+        values="value",
+        index="datetime",
+        columns=["ticker", "field"],
+        observed=True,
+    )
+    # Plain string labels whichever dtype the ticker and field columns had
+    pivot.columns = pivot.columns.set_levels(
+        [level.astype(str) for level in pivot.columns.levels]
+    )
+    return pivot
+
+
+def pivot_bar_chunks(chunks: Iterator[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Build the pivot incrementally from datetime-ordered raw chunks.
+
+    Rows of the last timestamp in a chunk are carried into the next one, so
+    every timestamp is pivoted with all of its rows and the
+    result equals ``pivot_bars`` on the full result.
+    """
+    partials: List[pd.DataFrame] = []
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        last = chunk["datetime"].iloc[-1]
+        is_last = chunk["datetime"] == last
+        carry = chunk[is_last]
+        if not is_last.all():
+            partials.append(pivot_bars(chunk[~is_last]))
+    if carry is not None:
+        partials.append(pivot_bars(carry))
+    if not partials:
+        return pd.DataFrame()
+    return pd.concat(partials).sort_index(axis=1)
+
+
+def bars_memory(df: pd.DataFrame) -> int:
+    """Deep memory usage of a frame in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def synthetic_bars(
+    tickers: List[str], fields: List[str], start: str, end: str, freq: str = "5min"
+) -> pd.DataFrame:
+    """Random long-format bars with object text columns, as the API produces them."""
+    index = pd.date_range(start, end, freq=freq, inclusive="left")
+    rows = len(index) * len(tickers) * len(fields)
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "datetime": np.tile(index.values, len(tickers) * len(fields)),
+            "ticker": np.repeat(
+                np.array(tickers, dtype=object), len(index) * len(fields)
+            ),
+            "field": np.tile(
+                np.repeat(np.array(fields, dtype=object), len(index)), len(tickers)
+            ),
+            "value": rng.random(rows),
+            "source": np.full(rows, "tiingo", dtype=object),
+        }
+    )